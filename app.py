@@ -1,23 +1,43 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import gspread
+from gspread.exceptions import APIError
+from gspread.http_client import HTTPClient
+from gspread.utils import DateTimeOption, Dimension, ValueRenderOption, rowcol_to_a1
+from google.auth.credentials import AnonymousCredentials
+from google.auth.transport.requests import Request
 from google.oauth2.service_account import Credentials
-from datetime import datetime
+from datetime import datetime, timezone
+import asyncio
+import hashlib
+import html
 import json
-from collections import defaultdict
+import logging
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from urllib.parse import parse_qsl, urlencode, urlsplit
+from collections import Counter, OrderedDict, defaultdict
+from bisect import bisect_left
+import heapq
+import unicodedata
 import plotly.express as px
 import plotly.graph_objects as go
+import pyarrow as pa
+import pyarrow.parquet as pq
 
-# Page configuration
-st.set_page_config(
-    page_title="LinkedIn Chat Viewer",
-    page_icon="💬",
-    layout="wide",
-    initial_sidebar_state="expanded"
-)
+import metrics
+
+logger = logging.getLogger(__name__)
 
 # Custom CSS for better card styling
-st.markdown("""
+PAGE_CSS = """
 <style>
     @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap');
     
@@ -86,6 +106,11 @@ st.markdown("""
         font-size: 0.95em;
     }
     
+    .contact-stat-item.unread {
+        background: #f59e0b;
+        font-weight: 600;
+    }
+    
     .message-received {
         background: white;
         padding: 25px;
@@ -347,7 +372,7 @@ st.markdown("""
         font-size: 1.2em;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
 
 # Google Sheets Configuration
 SPREADSHEET_ID = "1klm60YFXSoV510S4igv5LfREXeykDhNA5Ygq7HNFN0I"
@@ -359,46 +384,906 @@ MY_PROFILE = {
     "url": "https://www.linkedin.com/in/donmenicohudson/"
 }
 
-@st.cache_resource
+def get_setting(name, default=None):
+    """Read a deployment setting from the LINKUP_<NAME> environment variable, then st.secrets"""
+    value = os.environ.get(f"LINKUP_{name.upper()}")
+    if value is not None:
+        return value
+    try:
+        return st.secrets.get(name, default)
+    except Exception:
+        return default
+
+# Profiles whose messages count as "mine"; one entry per LinkedIn account sharing the sheet.
+# Configure as a JSON list of {"name": ..., "url": ...} objects.
+OWNER_PROFILES = get_setting("owner_profiles", [MY_PROFILE])
+if isinstance(OWNER_PROFILES, str):
+    OWNER_PROFILES = json.loads(OWNER_PROFILES)
+OWNER_PROFILES = [dict(profile) for profile in OWNER_PROFILES]
+
+# Owner partition key covering every profile's messages
+ALL_OWNERS = -1
+
+# Base URL replacing https://sheets.googleapis.com, e.g. a local fake_sheets.py server.
+# When set, requests go out unauthenticated and uploaded credentials are not used.
+SHEETS_ENDPOINT = get_setting("sheets_endpoint")
+
+# Service account JSON file on the server. When set, or when SHEETS_ENDPOINT needs no credentials,
+# the app connects and warms its caches at startup and the sidebar upload is skipped.
+CREDENTIALS_FILE = get_setting("credentials_file")
+
+# Retries for rate-limited (429) or failed (5xx) Sheets calls, and the first backoff in seconds
+SHEETS_MAX_RETRIES = int(get_setting("sheets_max_retries", 5))
+SHEETS_RETRY_DELAY = float(get_setting("sheets_retry_delay", 1.0))
+
+# Authorized clients kept per process, one per service-account key, and the seconds a client may sit
+# unused before it is dropped
+CLIENT_REGISTRY_SIZE = int(get_setting("client_registry_size", 8))
+CLIENT_IDLE_SECONDS = int(get_setting("client_idle_seconds", 3600))
+
+# Access tokens this close to expiry, in seconds, are refreshed in the background before a request needs them
+TOKEN_REFRESH_MARGIN = 300
+
+# Sheet rows per range request when loading, and range requests in flight at once
+FETCH_CHUNK_ROWS = 20000
+SHEETS_FETCH_CONCURRENCY = int(get_setting("sheets_fetch_concurrency", 4))
+
+# Local port serving Prometheus metrics at /metrics, and/or a file the metrics are dumped to after every rerun
+METRICS_PORT = get_setting("metrics_port")
+METRICS_FILE = get_setting("metrics_file")
+
+# Seconds a synced snapshot is served before the sheet is checked again
+SYNC_INTERVAL = int(get_setting("sync_interval", 60))
+
+# Directory shared by every app process on this host for published snapshots
+SNAPSHOT_DIR = get_setting("snapshot_dir", os.path.join(tempfile.gettempdir(), "linkup-snapshots"))
+
+# Messages older than this many days keep their text in an on-disk store instead of memory and
+# are read back only for the rows a page or conversation shows; unset keeps every message in memory
+MESSAGE_HORIZON_DAYS = get_setting("message_horizon_days")
+
+# Rows per zstd-compressed Parquet row group in a message store; also the fewest rows spilled at once,
+# so frequent syncs do not leave a trail of tiny store files
+MESSAGE_STORE_GROUP_ROWS = 4096
+
+# Decoded message-store row groups kept in memory for paging back and forth
+MESSAGE_STORE_CACHED_GROUPS = 64
+
+# Phrase-search candidates whose message text is read back and checked at once
+PHRASE_BATCH_ROWS = 50000
+
+# Directory next to a worksheet's snapshots with one file per visitor recording how far into the sheet they have seen
+WATERMARKS_DIR = "watermarks"
+
+# Cookie naming the browser whose watermark to use when the app has no login, and how long it lasts
+VISITOR_COOKIE = "linkup_visitor"
+VISITOR_COOKIE_MAX_AGE = 365 * 24 * 3600
+
+# Columns the app reads from the sheet and the dtype each is built with
+SHEET_SCHEMA = {
+    'sender_name': str,
+    'sender_linkedin_url': str,
+    'lead_name': str,
+    'lead_linkedin_url': str,
+    'message': str,
+    'date': str,
+    'time': str,
+    'shared_content': str
+}
+
+# Number of messages shown per "load older" step in a conversation
+CONVERSATION_WINDOW = 50
+
+# Maximum number of contacts returned by the contact finder
+CONTACT_MATCH_LIMIT = 25
+
+# Number of message cards rendered per page in All Messages
+MESSAGE_PAGE_SIZE = 100
+
+# Number of contacts listed under Quick Stats
+TOP_CONTACTS = 5
+
+# Links inside shared_content, and query parameters stripped when normalizing them
+LINK_PATTERN = re.compile(r'(?:https?://|www\.)[^\s<>"\']+', re.IGNORECASE)
+TRACKING_PARAMS = ('utm_', 'trk', 'fbclid', 'gclid', 'li_fat_id', 'mc_')
+
+# Domain bucket for shared content that is not a link (uploaded files, documents)
+FILE_DOMAIN = "(files)"
+
+# Number of results in the similar-messages panel
+SIMILAR_MESSAGES = 10
+
+# TF-IDF postings are appended as one segment per sync and merged once there are more than this many
+TFIDF_MAX_SEGMENTS = 8
+
+# Word-search postings are appended the same way, one segment per sync
+TEXT_INDEX_MAX_SEGMENTS = 8
+
+# Message search tokens: parentheses, or an optionally negated, optionally fielded word or "quoted phrase"
+QUERY_TOKEN = re.compile(r'\s*(?:(\()|(\))|(-)?(?:(\w+):)?(?:"([^"]*)"?|([^\s()"]+)))')
+QUERY_FIELDS = ('from', 'after', 'before', 'has')
+
+class SheetsHTTPClient(HTTPClient):
+    """gspread HTTP client that backs off and retries on quota and server errors, redirected to SHEETS_ENDPOINT when set"""
+    
+    def request(self, method, endpoint, *args, **kwargs):
+        if SHEETS_ENDPOINT:
+            endpoint = endpoint.replace("https://sheets.googleapis.com", SHEETS_ENDPOINT.rstrip('/'), 1)
+        call = 'batchGet' if ':batchGet' in endpoint else 'values' if '/values/' in endpoint else 'metadata'
+        for attempt in range(SHEETS_MAX_RETRIES + 1):
+            started = time.perf_counter()
+            try:
+                response = super().request(method, endpoint, *args, **kwargs)
+                metrics.observe('linkup_sheets_request_seconds', time.perf_counter() - started, call=call, status=response.status_code)
+                return response
+            except APIError as e:
+                status = e.response.status_code
+                metrics.observe('linkup_sheets_request_seconds', time.perf_counter() - started, call=call, status=status)
+                if attempt == SHEETS_MAX_RETRIES or (status != 429 and status < 500):
+                    raise
+                metrics.inc('linkup_sheets_retries_total', status=status)
+                
+                # Honor Retry-After when given, otherwise exponential backoff with jitter
+                try:
+                    delay = float(e.response.headers.get('Retry-After'))
+                except (TypeError, ValueError):
+                    delay = SHEETS_RETRY_DELAY * 2 ** attempt * random.uniform(0.5, 1.0)
+                time.sleep(delay)
+
+def authorize_client(credentials_json):
+    """Authorize a gspread client from service account JSON, raising on bad credentials"""
+    if SHEETS_ENDPOINT:
+        return gspread.Client(AnonymousCredentials(), http_client=SheetsHTTPClient)
+    credentials_dict = json.loads(credentials_json)
+    scopes = [
+        'https://www.googleapis.com/auth/spreadsheets.readonly',
+        'https://www.googleapis.com/auth/drive.readonly'
+    ]
+    credentials = Credentials.from_service_account_info(
+        credentials_dict, 
+        scopes=scopes
+    )
+    return gspread.authorize(credentials, http_client=SheetsHTTPClient)
+
+def credential_identity(credentials_json):
+    """Registry key for a service account key: (client_email, private_key_id, private key digest)"""
+    # Against a test endpoint every key is one identity
+    if SHEETS_ENDPOINT:
+        return ('', '', '')
+    info = json.loads(credentials_json)
+    # A file that only repeats a known email and key ID must not get the client authorized with the real key
+    digest = hashlib.sha256(info['private_key'].encode('utf-8')).hexdigest()
+    return (info['client_email'], info['private_key_id'], digest)
+
+@metrics.cached_resource()
+def get_client_registry():
+    """Process-wide authorized clients keyed by credential identity, least recently used first"""
+    return {'clients': OrderedDict(), 'lock': threading.Lock()}
+
+def refresh_token(credentials, refreshing):
+    """Fetch a new access token off the request path; on failure the next request refreshes on demand"""
+    try:
+        credentials.refresh(Request())
+    except Exception as e:
+        logger.warning("Token refresh failed: %s", e)
+    finally:
+        refreshing.release()
+
+def refresh_expiring_token(entry):
+    """Start a background refresh once the client's token is within TOKEN_REFRESH_MARGIN of expiry"""
+    credentials = entry['client'].http_client.auth
+    expiry = getattr(credentials, 'expiry', None)
+    if expiry is None:
+        return
+    remaining = (expiry - datetime.now(timezone.utc).replace(tzinfo=None)).total_seconds()
+    if remaining < TOKEN_REFRESH_MARGIN and entry['refreshing'].acquire(blocking=False):
+        threading.Thread(target=refresh_token, args=(credentials, entry['refreshing']), daemon=True).start()
+
+def get_registered_client(credentials_json):
+    """The authorized client for this service-account key, shared by every session that presents it"""
+    identity = credential_identity(credentials_json)
+    registry = get_client_registry()
+    metrics.inc('linkup_cache_lookups_total', function='init_google_sheets')
+    with registry['lock']:
+        clients = registry['clients']
+        now = time.time()
+        # Idle clients are dropped, and beyond CLIENT_REGISTRY_SIZE the least recently used one goes
+        for key in [key for key, entry in clients.items() if now - entry['used_at'] > CLIENT_IDLE_SECONDS]:
+            clients.pop(key)['client'].http_client.session.close()
+        
+        entry = clients.get(identity)
+        # Keys are only decoded and authorized the first time an identity is seen
+        if entry is None:
+            metrics.inc('linkup_cache_misses_total', function='init_google_sheets')
+            entry = clients[identity] = {'client': authorize_client(credentials_json), 'refreshing': threading.Lock()}
+        clients.move_to_end(identity)
+        entry['used_at'] = now
+        while len(clients) > CLIENT_REGISTRY_SIZE:
+            clients.popitem(last=False)[1]['client'].http_client.session.close()
+    
+    refresh_expiring_token(entry)
+    return entry['client']
+
 def init_google_sheets(credentials_json):
     """Initialize Google Sheets connection with service account"""
     try:
-        credentials_dict = json.loads(credentials_json)
-        scopes = [
-            'https://www.googleapis.com/auth/spreadsheets.readonly',
-            'https://www.googleapis.com/auth/drive.readonly'
-        ]
-        credentials = Credentials.from_service_account_info(
-            credentials_dict, 
-            scopes=scopes
-        )
-        client = gspread.authorize(credentials)
-        return client
+        return get_registered_client(credentials_json)
     except Exception as e:
         st.error(f"Error initializing Google Sheets: {str(e)}")
         return None
 
-@st.cache_data(ttl=60)
+def read_server_credentials():
+    """Service account JSON configured on the server, or None when each user uploads their own"""
+    if CREDENTIALS_FILE:
+        with open(CREDENTIALS_FILE, encoding='utf-8') as f:
+            return f.read()
+    return "{}" if SHEETS_ENDPOINT else None
+
+def fetch_columns(worksheet, start_row=2, header=None, end_row=None):
+    """Fetch only the SHEET_SCHEMA columns, from `start_row` down to `end_row` (default: the end), into a typed DataFrame"""
+    if header is None:
+        header = worksheet.row_values(1)
+    present = [name for name in SHEET_SCHEMA if name in header]
+    
+    ranges = []
+    for name in present:
+        first_cell = rowcol_to_a1(start_row, header.index(name) + 1)
+        ranges.append(f"{first_cell}:{first_cell.rstrip('0123456789')}{end_row or ''}")
+    
+    # Unformatted column-major ranges in one batchGet: unused columns never leave Google and no
+    # per-cell numeric coercion runs, while date/time cells still arrive as formatted strings
+    value_ranges = worksheet.batch_get(
+        ranges,
+        major_dimension=Dimension.cols,
+        value_render_option=ValueRenderOption.unformatted,
+        date_time_render_option=DateTimeOption.formatted_string
+    ) if ranges else []
+    
+    # Each range holds a single column; the API trims trailing blanks, so pad to the longest
+    columns = {name: (values[0] if values else []) for name, values in zip(present, value_ranges)}
+    row_count = max((len(values) for values in columns.values()), default=0)
+    metrics.inc('linkup_sheets_rows_fetched_total', row_count)
+    
+    return pd.DataFrame({
+        name: pd.Series(
+            columns.get(name, []) + [''] * (row_count - len(columns.get(name, []))),
+            dtype=dtype
+        )
+        for name, dtype in SHEET_SCHEMA.items()
+    })
+
+def start_row_fetches(worksheet, start_row, header):
+    """Start fetch_columns from `start_row` down as concurrent FETCH_CHUNK_ROWS-row tasks, returned in sheet order"""
+    row_count = getattr(worksheet, 'row_count', None) or 0
+    starts = list(range(start_row, max(row_count, start_row) + 1, FETCH_CHUNK_ROWS))
+    semaphore = asyncio.Semaphore(SHEETS_FETCH_CONCURRENCY)
+    
+    async def fetch(first):
+        # The last chunk is open-ended, so rows appended since the grid size was read still arrive
+        last = first + FETCH_CHUNK_ROWS - 1 if first != starts[-1] else None
+        async with semaphore:
+            return await asyncio.to_thread(fetch_columns, worksheet, first, header, last)
+    
+    return [asyncio.create_task(fetch(first)) for first in starts]
+
+async def ordered_chunks(fetches):
+    """Yield fetched chunks in sheet order as soon as each is ready, while later ones keep downloading"""
+    missing = 0
+    for fetch in fetches:
+        chunk = await fetch
+        # The API trims blank rows off the end of every range; give a short chunk's rows back as blanks
+        # once a later chunk has data
+        if len(chunk) and missing:
+            yield pd.DataFrame({name: pd.Series([''] * missing, dtype=dtype) for name, dtype in SHEET_SCHEMA.items()})
+            missing = 0
+        if len(chunk):
+            yield chunk
+        missing += FETCH_CHUNK_ROWS - len(chunk)
+
+def new_sync_state():
+    """Empty incremental-sync bookkeeping"""
+    return {
+        'header': None,
+        'next_row': 2,
+        'seen': set(),
+        'raw_contact_ids': {},
+        'contact_ids': {},
+        'df': pd.DataFrame({
+            **{name: pd.Series([], dtype=dtype) for name, dtype in SHEET_SCHEMA.items()},
+            'sender_contact_id': pd.Series([], dtype=np.int64),
+            'lead_contact_id': pd.Series([], dtype=np.int64),
+            'sender_owner': pd.Series([], dtype=np.int64),
+            'owner': pd.Series([], dtype=np.int64),
+            'message_store': pd.Series([], dtype=np.int64)
+        }),
+        # Changes whenever the frame is rebuilt from row 2, which moves row positions
+        'epoch': uuid.uuid4().hex,
+        'version': 0,
+        'synced_at': 0.0,
+        'expired': None,
+        'stats': {},
+        'summary': (0, {}),
+        'attachments': (0, parse_attachments(pd.DataFrame({'shared_content': pd.Series([], dtype=str)}))),
+        'text_index': (0, new_text_index()),
+        'tfidf': (0, new_tfidf_index())
+    }
+
+@metrics.cached_resource()
+def get_sync_state(spreadsheet_id, sheet_name):
+    """Process-wide sync state for one worksheet; survives cache clears and reruns"""
+    state = new_sync_state()
+    state['lock'] = threading.Lock()
+    return state
+
+def canonical_profile_url(url):
+    """Canonical form of a profile URL, ignoring case, scheme, www., query, fragment and trailing slash"""
+    url = str(url or '').strip().lower()
+    url = url.split('#', 1)[0].split('?', 1)[0]
+    url = re.sub(r'^[a-z][a-z0-9+.-]*://', '', url)
+    if url.startswith('www.'):
+        url = url[4:]
+    return url.rstrip('/')
+
+def assign_contact_ids(df, state):
+    """Add interned integer contact IDs for the sender and lead URLs (-1 when blank)"""
+    raw_ids = state['raw_contact_ids']
+    contact_ids = state['contact_ids']
+    for column, id_column in (('sender_linkedin_url', 'sender_contact_id'), ('lead_linkedin_url', 'lead_contact_id')):
+        codes, uniques = pd.factorize(column_or_blank(df, column))
+        ids = np.empty(len(uniques), dtype=np.int64)
+        for i, raw in enumerate(uniques):
+            # Canonicalize once per distinct raw URL ever seen; the registry lives in the sync state so IDs
+            # stay stable across syncs
+            if raw not in raw_ids:
+                canonical = canonical_profile_url(raw)
+                raw_ids[raw] = contact_ids.setdefault(canonical, len(contact_ids)) if canonical else -1
+            ids[i] = raw_ids[raw]
+        df[id_column] = ids[codes]
+    return df
+
+def hash_message_rows(df):
+    """Vectorized uint64 hash of each row's normalized (sender, lead, timestamp, message)"""
+    key = pd.DataFrame({
+        'sender': df['sender_contact_id'],
+        'lead': df['lead_contact_id'],
+        'timestamp': column_or_blank(df, 'date').str.strip() + ' ' + column_or_blank(df, 'time').str.strip(),
+        'message': column_or_blank(df, 'message').str.split().str.join(' ')
+    })
+    return pd.util.hash_pandas_object(key, index=False).to_numpy()
+
+def drop_seen_rows(chunk, state, added):
+    """Intern a fetched chunk's contact IDs and owners, then drop messages already seen; chunks arrive in sheet order"""
+    assign_contact_ids(chunk, state)
+    assign_sender_owners(chunk, state)
+    chunk['message_store'] = np.int64(-1)
+    seen = state['seen']
+    keep = np.zeros(len(chunk), dtype=bool)
+    # Scraper exports overlap earlier syncs and repeat rows within a batch; this sync's new hashes
+    # collect in `added` until the whole sync succeeds
+    for i, row_hash in enumerate(hash_message_rows(chunk).tolist()):
+        if row_hash not in seen and row_hash not in added:
+            added.add(row_hash)
+            keep[i] = True
+    return chunk[keep]
+
+async def sync_worksheet(worksheet, state):
+    """Append the sheet rows added since the last sync, dropping duplicate messages, in O(new rows)"""
+    # Fetch the new rows alongside the header, locating columns through the last header seen
+    header_fetch = asyncio.create_task(asyncio.to_thread(worksheet.row_values, 1))
+    fetches = start_row_fetches(worksheet, state['next_row'], state['header']) if state['header'] else []
+    header = await header_fetch
+    # A changed header means columns moved, which forces a full resync
+    if header != state['header']:
+        await asyncio.gather(*fetches, return_exceptions=True)
+        state.update(new_sync_state())
+        state['header'] = header
+        fetches = start_row_fetches(worksheet, state['next_row'], header)
+    
+    # Each chunk is deduplicated while the ones after it are still downloading; the state
+    # only moves on once every chunk has arrived
+    parts, added, fetched = [], set(), 0
+    async for chunk in ordered_chunks(fetches):
+        fetched += len(chunk)
+        parts.append(drop_seen_rows(chunk, state, added))
+    delta = pd.concat(parts, ignore_index=True) if parts else None
+    if delta is None or delta.empty:
+        state['next_row'] += fetched
+        state['seen'] |= added
+        return
+    
+    # Fold the new rows' hashes into the version so derived indexes rebuild only when data changes
+    delta_hash = int(pd.util.hash_pandas_object(delta, index=False).sum())
+    version = (state['version'] * 1000003 + delta_hash) % (1 << 63)
+    previous = state['df']
+    df = assign_thread_owners(pd.concat([previous, delta], ignore_index=True))
+    df.attrs['data_version'] = version
+    df.attrs['sync_epoch'] = state['epoch']
+    
+    # Build everything derived from the delta before touching the state, so a failure leaves
+    # the last good snapshot in place and the same rows are fetched again next time
+    stats = stats_delta(df, previous)
+    attachments = pd.concat([state['attachments'][1], parse_attachments(delta, offset=len(previous))], ignore_index=True)
+    text_index = append_text_index(state['text_index'][1], delta, len(previous))
+    tfidf = append_tfidf(state['tfidf'][1], column_or_blank(delta, 'message'), len(previous))
+    
+    state['next_row'] += fetched
+    state['seen'] |= added
+    state['version'] = version
+    state['df'] = df
+    merge_stats(state['stats'], stats)
+    state['summary'] = (version, {owner: summarize_stats(entry) for owner, entry in state['stats'].items()})
+    state['attachments'] = (version, attachments)
+    state['text_index'] = (version, text_index)
+    state['tfidf'] = (version, tfidf)
+
+def snapshot_paths(spreadsheet_id, sheet_name):
+    """Directory and version-pointer file for one worksheet's published snapshots"""
+    directory = os.path.join(SNAPSHOT_DIR, re.sub(r'[^A-Za-z0-9_-]+', '_', f"{spreadsheet_id}_{sheet_name}"))
+    return directory, os.path.join(directory, "CURRENT.json")
+
+def read_snapshot_pointer(pointer_path):
+    """Return the published snapshot metadata, or None when nothing usable is published"""
+    try:
+        with open(pointer_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def save_sync_indexes(state, path):
+    """Write the state's seen hashes, text index and TF-IDF index to one .npz file"""
+    text_index, tfidf = state['text_index'][1], state['tfidf'][1]
+    arrays = {
+        'seen': np.fromiter(state['seen'], dtype=np.uint64, count=len(state['seen'])),
+        'sizes': np.array([text_index['size'], len(text_index['segments']), tfidf['size'], len(tfidf['segments'])]),
+        # Term IDs are assigned in insertion order, so the vocabulary is stored as a list
+        'tfidf_vocabulary': np.array(list(tfidf['vocabulary']), dtype=str),
+        'tfidf_doc_freq': tfidf['doc_freq']
+    }
+    for prefix, index in (('text', text_index), ('tfidf', tfidf)):
+        for i, segment in enumerate(index['segments']):
+            arrays.update({f"{prefix}_{i}_{key}": value for key, value in segment.items()})
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), suffix=".tmp", delete=False) as tmp:
+        np.savez(tmp, **arrays)
+    os.replace(tmp.name, path)
+
+def load_sync_indexes(path):
+    """Seen-hash set, text index and TF-IDF index written by save_sync_indexes"""
+    with np.load(path) as arrays:
+        text_size, text_segments, tfidf_size, tfidf_segments = arrays['sizes'].tolist()
+        text_index = {'size': text_size, 'segments': [
+            {key: arrays[f"text_{i}_{key}"] for key in ('vocabulary', 'bounds', 'postings')} for i in range(text_segments)
+        ]}
+        tfidf = {
+            'vocabulary': {word: term for term, word in enumerate(arrays['tfidf_vocabulary'].tolist())},
+            'doc_freq': arrays['tfidf_doc_freq'],
+            'size': tfidf_size,
+            'segments': [
+                {key: arrays[f"tfidf_{i}_{key}"] for key in ('indptr', 'rows', 'weights')} for i in range(tfidf_segments)
+            ]
+        }
+        return set(arrays['seen'].tolist()), text_index, tfidf
+
+def publish_snapshot(state, directory, pointer_path):
+    """Write the state's frame and sync indexes next to each other and point CURRENT.json at them"""
+    os.makedirs(directory, exist_ok=True)
+    filename = f"snapshot-{state['version']}.arrow"
+    path = os.path.join(directory, filename)
+    # Files are written under temporary names and renamed into place, so readers never see a partial snapshot
+    if not os.path.exists(path):
+        table = pa.Table.from_pandas(state['df'], preserve_index=False)
+        with tempfile.NamedTemporaryFile(dir=directory, suffix=".tmp", delete=False) as tmp:
+            with pa.ipc.new_file(tmp, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp.name, path)
+    indexes = f"indexes-{state['version']}.npz"
+    if not os.path.exists(os.path.join(directory, indexes)):
+        save_sync_indexes(state, os.path.join(directory, indexes))
+    
+    previous = read_snapshot_pointer(pointer_path)
+    stores = message_stores(state['df'])
+    pointer = {
+        'version': state['version'],
+        'epoch': state['epoch'],
+        'file': filename,
+        'indexes': indexes,
+        'message_stores': np.unique(stores[stores >= 0]).tolist(),
+        'next_row': state['next_row'],
+        'header': state['header'],
+        'synced_at': state['synced_at'],
+        'stats': {
+            str(owner): {**entry, 'contacts': {str(k): v for k, v in entry['contacts'].items()},
+                         'replies': {str(k): v for k, v in entry['replies'].items()}}
+            for owner, entry in state['stats'].items()
+        }
+    }
+    with tempfile.NamedTemporaryFile('w', dir=directory, suffix=".tmp", delete=False) as tmp:
+        json.dump(pointer, tmp)
+    os.replace(tmp.name, pointer_path)
+    
+    # Message stores are kept while the current or previous snapshot still points into them
+    keep = {filename, indexes, *((previous['file'], previous.get('indexes')) if previous else ())}
+    keep.update(f"messages-{store}.parquet" for store in pointer['message_stores'] + (previous or {}).get('message_stores', []))
+    # Older files go; processes still mapping them keep their pages
+    for name in os.listdir(directory):
+        if name.startswith(("snapshot-", "indexes-", "messages-")) and name not in keep:
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+
+def attach_snapshot(path):
+    """Memory-map a published snapshot; integer and (Arrow-backed, pandas 3) string columns reference the mapped pages"""
+    table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+    return table.to_pandas(split_blocks=True)
+
+def message_stores(df):
+    """Per-row ID of the on-disk store holding the message text, or -1 while it is in memory"""
+    if 'message_store' not in df.columns:
+        return np.full(len(df), -1, dtype=np.int64)
+    return df['message_store'].to_numpy()
+
+def message_store_path(store):
+    """Path of one message store, kept next to the worksheet's snapshots"""
+    directory, _ = snapshot_paths(SPREADSHEET_ID, SHEET_NAME)
+    return os.path.join(directory, f"messages-{store}.parquet")
+
+def spill_messages(state):
+    """Move the text of messages older than MESSAGE_HORIZON_DAYS from the frame to a new message store"""
+    df = state['df']
+    candidates = np.flatnonzero((message_stores(df) < 0) & (column_or_blank(df, 'message') != '').to_numpy())
+    cutoff = (pd.Timestamp.now() - pd.Timedelta(days=float(MESSAGE_HORIZON_DAYS))).value
+    rows = candidates[get_message_timestamps(df.iloc[candidates]) < cutoff]
+    # Nothing is written until a full row group's worth is due
+    if len(rows) < MESSAGE_STORE_GROUP_ROWS:
+        return
+    
+    # The store is a zstd-compressed Parquet file of (row, message) sorted by row, named after this version
+    path = message_store_path(state['version'])
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    table = pa.table({
+        'row': pa.array(rows, type=pa.int64()),
+        'message': pa.array(df['message'].to_numpy(dtype=object)[rows], type=pa.string())
+    })
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), suffix=".tmp", delete=False) as tmp:
+        pq.write_table(table, tmp, row_group_size=MESSAGE_STORE_GROUP_ROWS, compression='zstd')
+    os.replace(tmp.name, path)
+    
+    # Spilled rows keep every other column; `message_store` points at the file holding their text
+    spilled = np.zeros(len(df), dtype=bool)
+    spilled[rows] = True
+    df['message'] = df['message'].mask(spilled, '')
+    df['message_store'] = np.where(spilled, state['version'], df['message_store'].to_numpy())
+
+@metrics.cached_resource(max_entries=256)
+def get_message_store_groups(path):
+    """Last row position in each row group of a message store, from the Parquet footer statistics"""
+    metadata = pq.ParquetFile(path).metadata
+    return np.array([
+        metadata.row_group(group).column(0).statistics.max for group in range(metadata.num_row_groups)
+    ], dtype=np.int64)
+
+@metrics.cached_resource(max_entries=MESSAGE_STORE_CACHED_GROUPS)
+def read_message_group(path, group):
+    """Row positions and message text of one decoded message-store row group"""
+    table = pq.ParquetFile(path).read_row_group(group)
+    return table['row'].to_numpy(), table['message'].to_numpy(zero_copy_only=False)
+
+def with_message_text(df, positions):
+    """The rows at `positions`, with spilled message text read back from only the row groups holding it"""
+    positions = np.asarray(positions, dtype=np.int64)
+    frame = df.iloc[positions]
+    stores = message_stores(df)[positions]
+    if not (stores >= 0).any():
+        return frame
+    
+    messages = column_or_blank(frame, 'message').to_numpy(dtype=object)
+    for store in np.unique(stores[stores >= 0]).tolist():
+        path = message_store_path(store)
+        wanted = np.flatnonzero(stores == store)
+        # Row groups cover sorted, disjoint row ranges, so the first group ending at or after a row holds it
+        groups = np.searchsorted(get_message_store_groups(path), positions[wanted], side='left')
+        for group in np.unique(groups).tolist():
+            rows, texts = read_message_group(path, group)
+            inside = wanted[groups == group]
+            messages[inside] = texts[np.searchsorted(rows, positions[inside])]
+    frame = frame.copy()
+    frame['message'] = pd.Series(messages, index=frame.index, dtype=str)
+    return frame
+
+def message_text(df):
+    """Every row's message text, streaming spilled messages back from their stores; for index builds"""
+    messages = column_or_blank(df, 'message')
+    stores = message_stores(df)
+    if not (stores >= 0).any():
+        return messages
+    
+    messages = messages.to_numpy(dtype=object)
+    for store in np.unique(stores[stores >= 0]).tolist():
+        for batch in pq.ParquetFile(message_store_path(store)).iter_batches():
+            messages[batch.column('row').to_numpy()] = batch.column('message').to_numpy(zero_copy_only=False)
+    return pd.Series(messages, index=df.index, dtype=str)
+
+def adopt_snapshot(state, df, pointer):
+    """Switch the local sync state to a snapshot another process published, so later syncs continue from it"""
+    if 'message_store' not in df.columns:
+        df['message_store'] = np.int64(-1)
+    
+    # The seen hashes and search indexes travel with the snapshot; only snapshots published without
+    # them have their spilled message text read back to rebuild them
+    if 'indexes' in pointer:
+        directory, _ = snapshot_paths(SPREADSHEET_ID, SHEET_NAME)
+        seen, text_index, tfidf = load_sync_indexes(os.path.join(directory, pointer['indexes']))
+    else:
+        text = df.assign(message=message_text(df))
+        seen = set(hash_message_rows(text).tolist())
+        text_index = append_text_index(new_text_index(), text, 0)
+        tfidf = append_tfidf(new_tfidf_index(), text['message'], 0)
+    state['df'] = df
+    state['version'] = pointer['version']
+    state['epoch'] = pointer.get('epoch', state['epoch'])
+    state['next_row'] = pointer['next_row']
+    state['header'] = pointer['header']
+    state['seen'] = seen
+    # The URL registry comes from the snapshot's own columns, canonicalizing once per distinct URL
+    raw_ids = {}
+    for column, id_column in (('sender_linkedin_url', 'sender_contact_id'), ('lead_linkedin_url', 'lead_contact_id')):
+        pairs = pd.DataFrame({'raw': column_or_blank(df, column), 'id': df[id_column]}).drop_duplicates()
+        raw_ids.update(zip(pairs['raw'], pairs['id'].tolist()))
+    state['raw_contact_ids'] = raw_ids
+    state['contact_ids'] = {canonical_profile_url(raw): contact_id for raw, contact_id in raw_ids.items() if contact_id >= 0}
+    df.attrs['data_version'] = state['version']
+    df.attrs['sync_epoch'] = state['epoch']
+    
+    # Stats travel with the snapshot; rebuild them only if the publisher did not include them
+    if 'stats' in pointer:
+        state['stats'] = {
+            int(owner): {**entry, 'contacts': {int(k): v for k, v in entry['contacts'].items()},
+                         'replies': {int(k): v for k, v in entry['replies'].items()}}
+            for owner, entry in pointer['stats'].items()
+        }
+    else:
+        state['stats'] = {}
+        accumulate_stats(state['stats'], df, df['owner'].to_numpy())
+    state['summary'] = (state['version'], {owner: summarize_stats(entry) for owner, entry in state['stats'].items()})
+    state['attachments'] = (state['version'], parse_attachments(df))
+    state['text_index'] = (state['version'], text_index)
+    state['tfidf'] = (state['version'], tfidf)
+
+async def refresh_snapshot_async(client, state):
+    """Bring the state up to date, preferring a fresh snapshot published by another process"""
+    now = time.time()
+    expired = state['expired']
+    if not expired and now - state['synced_at'] < SYNC_INTERVAL:
+        metrics.inc('linkup_snapshot_refreshes_total', outcome='fresh')
+        return
+    
+    directory, pointer_path = snapshot_paths(SPREADSHEET_ID, SHEET_NAME)
+    pointer = read_snapshot_pointer(pointer_path)
+    # A newer snapshot from another process on this host is attached without touching Sheets;
+    # after expire_snapshot the sheet is always read
+    if not expired and pointer and now - pointer['synced_at'] < SYNC_INTERVAL:
+        try:
+            if pointer['version'] != state['version']:
+                adopt_snapshot(state, attach_snapshot(os.path.join(directory, pointer['file'])), pointer)
+            state['synced_at'] = pointer['synced_at']
+            metrics.inc('linkup_snapshot_refreshes_total', outcome='attached')
+            return
+        except OSError:
+            # Replaced between reading the pointer and mapping the file; sync directly instead
+            pass
+    
+    worksheet = await asyncio.to_thread(lambda: client.open_by_key(SPREADSHEET_ID).worksheet(SHEET_NAME))
+    version = state['version']
+    if expired == 'full':
+        # Incremental syncs only see appended rows; rebuild from row 2 to pick up edits and deletions,
+        # swapping the result in only once it is complete
+        fresh = new_sync_state()
+        await sync_worksheet(worksheet, fresh)
+        state.update(fresh)
+    else:
+        await sync_worksheet(worksheet, state)
+    if MESSAGE_HORIZON_DAYS and state['version'] != version:
+        spill_messages(state)
+    state['synced_at'] = now
+    state['expired'] = None
+    metrics.inc('linkup_snapshot_refreshes_total', outcome='resynced' if expired == 'full' else 'synced')
+    publish_snapshot(state, directory, pointer_path)
+
+def refresh_snapshot(client, state):
+    """Synchronous entry point to refresh_snapshot_async, run on its own event loop"""
+    asyncio.run(refresh_snapshot_async(client, state))
+
+def expire_snapshot(full=False):
+    """Make the next load_data call read the sheet, rebuilding it from scratch when `full`"""
+    state = get_sync_state(SPREADSHEET_ID, SHEET_NAME)
+    state['expired'] = 'full' if full or state['expired'] == 'full' else 'sync'
+
 def load_data(_client):
-    """Load data from Google Sheets with caching"""
+    """Load data from Google Sheets, returning the snapshot shared by all sessions on this host"""
     try:
-        spreadsheet = _client.open_by_key(SPREADSHEET_ID)
-        worksheet = spreadsheet.worksheet(SHEET_NAME)
-        data = worksheet.get_all_records()
-        df = pd.DataFrame(data)
-        return df
+        state = get_sync_state(SPREADSHEET_ID, SHEET_NAME)
+        with state['lock']:
+            refresh_snapshot(_client, state)
+            return state['df']
     except Exception as e:
         st.error(f"Error loading data: {str(e)}")
         return pd.DataFrame()
 
-def is_me(sender_name, sender_url):
-    """Check if the sender is me"""
-    if not sender_name or not isinstance(sender_name, str):
-        return False
-    return (
-        MY_PROFILE["name"].lower() in sender_name.lower() or
-        (sender_url and MY_PROFILE["url"].lower() in str(sender_url).lower())
+def visitor_id():
+    """The signed-in user's email, else this browser's visitor cookie, else None after asking the browser to keep one"""
+    if st.user.get('is_logged_in') and st.user.get('email'):
+        return st.user.get('email')
+    visitor = st.context.cookies.get(VISITOR_COOKIE)
+    if visitor:
+        return visitor
+    # The cookie only reaches the server with the browser's next page load, so this visit stays untracked
+    if 'visitor_cookie_set' not in st.session_state:
+        st.session_state['visitor_cookie_set'] = True
+        st.html(
+            f"<script>document.cookie = '{VISITOR_COOKIE}={uuid.uuid4().hex}; max-age={VISITOR_COOKIE_MAX_AGE}; path=/; SameSite=Lax';</script>",
+            unsafe_allow_javascript=True
+        )
+    return None
+
+def watermark_path(visitor):
+    """File holding one visitor's watermark; each visitor has their own so replicas never overwrite each other"""
+    directory, _ = snapshot_paths(SPREADSHEET_ID, SHEET_NAME)
+    digest = hashlib.sha256(visitor.encode('utf-8')).hexdigest()[:32]
+    return os.path.join(directory, WATERMARKS_DIR, f"{digest}.json")
+
+def read_watermark(visitor):
+    """The visitor's stored watermark, or None on their first visit"""
+    try:
+        with open(watermark_path(visitor)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def save_watermark(visitor, mark):
+    """Record that `visitor` has seen everything up to `mark`"""
+    path = watermark_path(visitor)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with tempfile.NamedTemporaryFile('w', dir=os.path.dirname(path), suffix=".tmp", delete=False) as tmp:
+        json.dump(mark, tmp)
+    os.replace(tmp.name, path)
+
+def visit_mark(df, message_index):
+    """Watermark covering every loaded row: its sync epoch, row count and newest message timestamp"""
+    newest = message_index['sorted_timestamps'][-1] if len(message_index['order']) else 0
+    return {'epoch': df.attrs.get('sync_epoch'), 'row': len(df), 'newest': int(newest), 'seen_at': time.time()}
+
+def start_visit(mark):
+    """The watermark this session compares against, advancing the stored one to `mark`"""
+    visitor = visitor_id()
+    if 'last_visit' not in st.session_state:
+        # The session keeps the mark it opened with, so new messages stay marked until it marks them read;
+        # first visits and visitors without an identity start with nothing new
+        stored = read_watermark(visitor) if visitor else None
+        st.session_state['last_visit'] = stored or {**mark, 'untracked': visitor is None}
+    if visitor and st.session_state.get('watermark_saved') != (mark['epoch'], mark['row']):
+        try:
+            save_watermark(visitor, mark)
+            st.session_state['watermark_saved'] = (mark['epoch'], mark['row'])
+        except OSError:
+            # An unwritable snapshot directory only costs the next visit its highlights
+            pass
+    return st.session_state['last_visit']
+
+def get_new_rows(df, watermark, message_index, owner):
+    """Row positions added since `watermark` within one owner's partition, newest first"""
+    # Within one sync epoch rows are only appended, so everything past the mark is new: O(new rows)
+    if watermark.get('epoch') == df.attrs.get('sync_epoch'):
+        start = watermark['row']
+        positions = np.arange(start, len(df))
+        if owner != ALL_OWNERS:
+            positions = positions[df['owner'].to_numpy()[start:] == owner]
+        return positions[::-1]
+    
+    # A full resync, header change or restart rebuilt the frame and moved row positions;
+    # re-base on the newest message timestamp the mark covered instead
+    newest = watermark.get('newest', np.iinfo(np.int64).max)
+    split = np.searchsorted(message_index['sorted_timestamps'], newest, side='right')
+    return message_index['order'][split:][::-1]
+
+def count_unread(df, positions):
+    """New messages per contact among `positions`, counting only those the contact sent"""
+    if not len(positions):
+        return {}
+    mine, _, row_contacts = get_row_contacts(df.iloc[positions])
+    contact_ids, counts = np.unique(row_contacts[~mine & (row_contacts >= 0)], return_counts=True)
+    return dict(zip(contact_ids.tolist(), counts.tolist()))
+
+def warm_up():
+    """Connect with the server credentials, load the snapshot and build every derived index, raising on failure"""
+    # Called directly rather than through init_google_sheets/load_data, whose st.error reports go
+    # nowhere on this thread
+    client = get_registered_client(read_server_credentials())
+    if client is None:
+        raise RuntimeError("no Sheets client for the server credentials")
+    state = get_sync_state(SPREADSHEET_ID, SHEET_NAME)
+    with state['lock']:
+        refresh_snapshot(client, state)
+        df = state['df']
+    if df.empty:
+        raise RuntimeError("the sheet has no rows")
+    data_version = get_data_version(df)
+    get_owner_indexes(df, data_version)
+    get_text_index(df, data_version)
+    get_similarity_index(df, data_version)
+
+def keep_warm():
+    """Warm up now and again after every SYNC_INTERVAL, so new data is indexed before anyone asks for it"""
+    while True:
+        try:
+            warm_up()
+        except Exception as e:
+            logger.warning("Warm-up failed: %s", e)
+        time.sleep(max(SYNC_INTERVAL, 1))
+
+@metrics.cached_resource()
+def start_warm_up():
+    """Start the process's warm-up thread once, when server-side credentials are configured"""
+    if read_server_credentials() is None:
+        return None
+    thread = threading.Thread(target=keep_warm, name="linkup-warm-up", daemon=True)
+    
+    # Streamlit would warn that this thread has no session on every cached call it makes
+    logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").addFilter(
+        lambda record: record.threadName != thread.name
     )
+    thread.start()
+    return thread
+
+def assign_sender_owners(df, state):
+    """Add the `sender_owner` column: the owner profile that sent each message, or -1"""
+    contact_ids = state['contact_ids']
+    owners_by_id, owners_by_name = {}, {}
+    # Earlier profiles win when two share a URL or name
+    for owner, profile in reversed(list(enumerate(OWNER_PROFILES))):
+        canonical = canonical_profile_url(profile.get('url'))
+        if canonical in contact_ids:
+            owners_by_id[contact_ids[canonical]] = owner
+        owners_by_name[normalize_name(profile.get('name'))] = owner
+    owners_by_name.pop('', None)
+    
+    # A sender is an owner when their interned profile URL (any scheme, www., case or slash variant)
+    # or their exact normalized name matches a profile; scrapers may record member-ID URLs instead
+    sender_ids = df['sender_contact_id'].to_numpy()
+    ids, id_codes = np.unique(sender_ids, return_inverse=True)
+    url_owners = np.array([owners_by_id.get(contact_id, -1) for contact_id in ids.tolist()], dtype=np.int64)
+    name_codes, names = pd.factorize(column_or_blank(df, 'sender_name'))
+    name_owners = np.array([owners_by_name.get(normalize_name(name), -1) for name in names], dtype=np.int64)
+    url_owners, name_owners = url_owners[id_codes], name_owners[name_codes]
+    df['sender_owner'] = np.where(url_owners >= 0, url_owners, name_owners)
+    return df
+
+def get_row_contacts(df):
+    """Per-row sent-by-an-owner mask, the non-owner party, and the contact each row belongs to"""
+    mine = df['sender_owner'].to_numpy() >= 0
+    sender_ids = df['sender_contact_id'].to_numpy()
+    lead_ids = df['lead_contact_id'].to_numpy()
+    has_sender_url = (column_or_blank(df, 'sender_linkedin_url') != '').to_numpy()
+    
+    # Their messages belong to the sender (falling back to the lead); mine belong to the lead
+    their_ids = np.where(has_sender_url, sender_ids, lead_ids)
+    return mine, their_ids, np.where(mine, lead_ids, their_ids)
+
+def assign_thread_owners(df):
+    """Add the `owner` column: who sent the message, or for replies, who owns the conversation"""
+    mine, their_ids, row_contacts = get_row_contacts(df)
+    sender_owner = df['sender_owner'].to_numpy()
+    # A conversation belongs to the first profile that messaged the contact; others are unassigned,
+    # except with a single configured profile, which owns everything
+    default = 0 if len(OWNER_PROFILES) == 1 else -1
+    
+    sent_rows = np.flatnonzero(mine & (row_contacts >= 0))
+    contact_ids, first_sent = np.unique(row_contacts[sent_rows], return_index=True)
+    thread_owner = np.full(max(int(row_contacts.max(initial=-1)), 0) + 2, default, dtype=np.int64)
+    thread_owner[contact_ids] = sender_owner[sent_rows[first_sent]]
+    
+    # Index -1 (no contact URL) lands on the trailing default slot
+    df['owner'] = np.where(mine, sender_owner, thread_owner[row_contacts])
+    return df
 
 def get_initials(name):
     """Get initials from name"""
@@ -409,58 +1294,809 @@ def get_initials(name):
         return f"{parts[0][0]}{parts[1][0]}".upper()
     return name[0].upper()
 
-def get_contact_info(df):
-    """Extract unique contacts (excluding myself)"""
+def escape_html(value):
+    """Sheet text made safe to place in markup, including quoted attribute values"""
+    return html.escape(str(value or ''))
+
+def profile_href(url):
+    """Escaped href for a scraped profile or link URL; anything but a web link becomes an inert #"""
+    url = str(url or '').strip()
+    if re.match(r'www\.', url, re.IGNORECASE):
+        url = f"https://{url}"
+    return escape_html(url) if re.match(r'https?://', url, re.IGNORECASE) else '#'
+
+def new_owner_stats():
+    """Empty running stats for one owner partition"""
+    return {'total': 0, 'sent': 0, 'attachments': 0, 'days': {}, 'contacts': {}, 'replies': {}}
+
+def add_counts(counts, keys, sign=1):
+    """Add (or subtract) occurrence counts of keys into a dict, dropping zeros"""
+    values, occurrences = np.unique(keys, return_counts=True)
+    for key, count in zip(values.tolist(), occurrences.tolist()):
+        counts[key] = counts.get(key, 0) + sign * count
+        if not counts[key]:
+            del counts[key]
+
+def accumulate_stats(stats, frame, owners, sign=1):
+    """Add (sign=1) or remove (sign=-1) rows' contributions to the running per-owner stats"""
+    if frame.empty:
+        return
+    mine, their_ids, row_contacts = get_row_contacts(frame)
+    attached = (column_or_blank(frame, 'shared_content') != '').to_numpy()
+    dates = column_or_blank(frame, 'date').to_numpy()
+    
+    # `owners` holds each row's owner partition; every row also counts toward ALL_OWNERS
+    for owner in [ALL_OWNERS] + np.unique(owners[owners >= 0]).tolist():
+        rows = np.ones(len(frame), dtype=bool) if owner == ALL_OWNERS else owners == owner
+        entry = stats.setdefault(owner, new_owner_stats())
+        entry['total'] += sign * int(rows.sum())
+        entry['sent'] += sign * int((rows & mine).sum())
+        entry['attachments'] += sign * int((rows & attached).sum())
+        add_counts(entry['days'], dates[rows & (dates != '')], sign)
+        add_counts(entry['contacts'], row_contacts[rows & (row_contacts >= 0)], sign)
+        add_counts(entry['replies'], their_ids[rows & ~mine & (their_ids >= 0)], sign)
+
+def summarize_stats(entry):
+    """Overview numbers for one owner partition"""
+    contacts = entry['contacts']
+    top = heapq.nlargest(TOP_CONTACTS, entry['replies'], key=lambda contact_id: contacts.get(contact_id, 0))
+    return {
+        'total': entry['total'],
+        'sent': entry['sent'],
+        'received': entry['total'] - entry['sent'],
+        'active_contacts': len(entry['replies']),
+        'active_days': len(entry['days']),
+        'per_day': entry['total'] / len(entry['days']) if entry['days'] else 0.0,
+        'attachments': entry['attachments'],
+        'top_contacts': [(contact_id, contacts.get(contact_id, 0)) for contact_id in top]
+    }
+
+def stats_delta(df, previous):
+    """Change to the running stats from a sync that grew `previous` into `df`, in O(new rows)"""
+    delta = {}
+    owners = df['owner'].to_numpy()
+    # Older replies whose conversation just gained an owner move between partitions
+    moved = np.flatnonzero(previous['owner'].to_numpy() != owners[:len(previous)])
+    if len(moved):
+        accumulate_stats(delta, previous.iloc[moved], previous['owner'].to_numpy()[moved], sign=-1)
+        accumulate_stats(delta, df.iloc[moved], owners[moved])
+    accumulate_stats(delta, df.iloc[len(previous):], owners[len(previous):])
+    return delta
+
+def merge_stats(stats, delta):
+    """Add a stats_delta into the running stats"""
+    for owner, change in delta.items():
+        entry = stats.setdefault(owner, new_owner_stats())
+        for field in ('total', 'sent', 'attachments'):
+            entry[field] += change[field]
+        for field in ('days', 'contacts', 'replies'):
+            counts = entry[field]
+            for key, count in change[field].items():
+                counts[key] = counts.get(key, 0) + count
+                if not counts[key]:
+                    del counts[key]
+
+def get_overview_stats(df, owner):
+    """Materialized stats for this snapshot, recomputed only if the sync state has moved on"""
+    version, summary = get_sync_state(SPREADSHEET_ID, SHEET_NAME)['summary']
+    if version != get_data_version(df):
+        stats = {}
+        accumulate_stats(stats, df, df['owner'].to_numpy())
+        summary = {key: summarize_stats(entry) for key, entry in stats.items()}
+    return summary.get(owner) or summarize_stats(new_owner_stats())
+
+def normalize_link(link):
+    """Canonical link and its domain: lowercase host without www., no tracking params, fragment or trailing slash"""
+    parts = urlsplit(link if '://' in link else f"https://{link}")
+    host = (parts.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    query = urlencode([
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith(TRACKING_PARAMS)
+    ])
+    port = f":{parts.port}" if parts.port else ''
+    normalized = f"{parts.scheme.lower()}://{host}{port}{parts.path.rstrip('/')}"
+    return (f"{normalized}?{query}" if query else normalized), host
+
+def parse_shared_content(value):
+    """Split one shared_content cell into (link, domain) pairs; non-link content is a single file entry"""
+    value = str(value or '').strip()
+    if not value:
+        return []
+    links = LINK_PATTERN.findall(value)
+    if not links:
+        return [(value, FILE_DOMAIN)]
+    items = []
+    for link in links:
+        link = link.rstrip('.,;:!?)]}')
+        try:
+            items.append(normalize_link(link))
+        except ValueError:
+            # Scraped text can hold URL-shaped junk (a non-numeric port, an unclosed IPv6 bracket)
+            items.append((link, FILE_DOMAIN))
+    return items
+
+def parse_attachments(frame, offset=0):
+    """One (row, link, domain) record per shared item, with rows shifted by `offset` when `frame` is a delta"""
+    codes, uniques = pd.factorize(column_or_blank(frame, 'shared_content'))
+    parsed = [parse_shared_content(value) for value in uniques]
+    links = [link for items in parsed for link, _ in items]
+    domains = [domain for items in parsed for _, domain in items]
+    
+    # Expand rows by their cell's item count without a per-row Python loop
+    counts = np.array([len(items) for items in parsed], dtype=np.int64)
+    starts = np.cumsum(counts) - counts
+    rows = np.flatnonzero(counts[codes] > 0) if len(codes) else np.empty(0, dtype=np.int64)
+    repeats = counts[codes[rows]]
+    item_offsets = np.arange(repeats.sum()) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+    items = np.repeat(starts[codes[rows]], repeats) + item_offsets
+    
+    return pd.DataFrame({
+        'row': np.repeat(rows, repeats) + offset,
+        'link': pd.Series(np.array(links, dtype=object)[items] if links else [], dtype=str),
+        'domain': pd.Series(np.array(domains, dtype=object)[items] if domains else [], dtype=str)
+    })
+
+def get_attachment_records(df):
+    """Parsed attachment records for this snapshot, reusing the ones built during sync"""
+    version, records = get_sync_state(SPREADSHEET_ID, SHEET_NAME)['attachments']
+    return records if version == get_data_version(df) else parse_attachments(df)
+
+def new_tfidf_index():
+    """Empty term-frequency index: a growing vocabulary, document frequencies and CSC postings segments"""
+    return {'vocabulary': {}, 'doc_freq': np.zeros(0, dtype=np.int64), 'size': 0, 'segments': []}
+
+def term_counts(messages, vocabulary):
+    """Sorted (term, row, count) arrays for a batch of messages, adding unseen words to `vocabulary`"""
+    words = messages.str.casefold().str.findall(r'\w+')
+    rows = np.repeat(np.arange(len(messages)), words.str.len().to_numpy())
+    codes, uniques = pd.factorize(words.explode().dropna())
+    term_ids = np.array([vocabulary.setdefault(word, len(vocabulary)) for word in uniques], dtype=np.int64)
+    
+    # One key per (term, row) pair orders postings by term, then row
+    keys, counts = np.unique(term_ids[codes] * len(messages) + rows, return_counts=True)
+    return keys // len(messages), keys % len(messages), counts
+
+def tfidf_segment(terms, rows, weights, vocabulary_size):
+    """CSC postings segment from term-sorted (term, row, weight) arrays"""
+    return {
+        'indptr': np.searchsorted(terms, np.arange(vocabulary_size + 1)),
+        'rows': rows,
+        'weights': weights
+    }
+
+def segment_terms(segment):
+    """Term ID of every posting in a segment"""
+    indptr = segment['indptr']
+    return np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+
+def append_tfidf(index, messages, offset):
+    """Return the index extended with a postings segment for `messages`, whose rows start at `offset`"""
+    vocabulary = index['vocabulary']
+    terms, rows, counts = term_counts(messages, vocabulary)
+    doc_freq = np.zeros(len(vocabulary), dtype=np.int64)
+    doc_freq[:len(index['doc_freq'])] = index['doc_freq']
+    doc_freq += np.bincount(terms, minlength=len(vocabulary))
+    
+    # Only raw log term frequencies are stored; idf depends on the final document count, so it is
+    # applied when scoring
+    weights = (1 + np.log(counts)).astype(np.float32)
+    segments = index['segments'] + [tfidf_segment(terms, rows + offset, weights, len(vocabulary))]
+    if len(segments) > TFIDF_MAX_SEGMENTS:
+        terms = np.concatenate([segment_terms(segment) for segment in segments])
+        rows = np.concatenate([segment['rows'] for segment in segments])
+        order = np.lexsort((rows, terms))
+        weights = np.concatenate([segment['weights'] for segment in segments])[order]
+        segments = [tfidf_segment(terms[order], rows[order], weights, len(vocabulary))]
+    return {'vocabulary': vocabulary, 'doc_freq': doc_freq, 'size': offset + len(messages), 'segments': segments}
+
+@metrics.cached_resource(max_entries=2)
+def get_similarity_index(_df, data_version):
+    """TF-IDF postings for this data version with idf weights and row norms computed"""
+    version, index = get_sync_state(SPREADSHEET_ID, SHEET_NAME)['tfidf']
+    if version != data_version:
+        index = append_tfidf(new_tfidf_index(), message_text(_df), 0)
+    idf = np.log((1 + index['size']) / (1 + index['doc_freq'])) + 1
+    squares = np.zeros(index['size'])
+    for segment in index['segments']:
+        weights = segment['weights'] * idf[segment_terms(segment)]
+        squares += np.bincount(segment['rows'], weights=weights ** 2, minlength=index['size'])
+    return {'index': index, 'idf': idf, 'norms': np.sqrt(squares)}
+
+def find_similar_messages(df, similarity, position, eligible, limit=SIMILAR_MESSAGES):
+    """Top (row, cosine score) matches for one message among `eligible` rows of other conversations"""
+    index, idf, norms = similarity['index'], similarity['idf'], similarity['norms']
+    vocabulary = index['vocabulary']
+    words = re.findall(r'\w+', with_message_text(df, [position])['message'].iat[0].casefold())
+    counts = Counter(vocabulary[word] for word in words if vocabulary.get(word, len(idf)) < len(idf))
+    if not counts:
+        return []
+    
+    # Only the postings of the message's own terms are read, and scores are accumulated with one bincount
+    rows, weights = [], []
+    query_norm = 0.0
+    for term, count in counts.items():
+        query_weight = (1 + np.log(count)) * idf[term]
+        query_norm += query_weight ** 2
+        for segment in index['segments']:
+            indptr = segment['indptr']
+            if term + 1 < len(indptr):
+                start, end = indptr[term], indptr[term + 1]
+                rows.append(segment['rows'][start:end])
+                weights.append(segment['weights'][start:end] * (query_weight * idf[term]))
+    scores = np.bincount(np.concatenate(rows), weights=np.concatenate(weights), minlength=index['size'])
+    scores /= np.maximum(norms, np.finfo(float).tiny) * np.sqrt(query_norm)
+    
+    # Skip the message's own conversation, so matches come from other contacts
+    _, _, row_contacts = get_row_contacts(df)
+    scores[~eligible | (row_contacts == row_contacts[position])] = 0
+    scores[position] = 0
+    top = np.argpartition(-scores, min(limit, len(scores) - 1))[:limit]
+    top = top[np.argsort(-scores[top], kind='stable')]
+    return [(row, float(scores[row])) for row in top.tolist() if scores[row] > 0]
+
+def build_attachment_index(records, in_partition):
+    """Row positions per shared domain and link, with share counts, for one partition"""
+    records = records[in_partition[records['row'].to_numpy()]]
+    by_domain = records.groupby('domain', sort=False)['row']
+    domain_rows = {domain: np.unique(rows.to_numpy()) for domain, rows in by_domain}
+    links = records.groupby('link', sort=False).agg(domain=('domain', 'first'), shares=('row', 'size'))
+    return {
+        'has_attachment': np.unique(records['row'].to_numpy()),
+        'domains': sorted(
+            ((domain, len(rows)) for domain, rows in domain_rows.items()),
+            key=lambda item: (-item[1], item[0])
+        ),
+        'domain_rows': domain_rows,
+        'links': links.sort_values('shares', ascending=False, kind='stable')
+    }
+
+def get_message_timestamps(df):
+    """Parse date/time columns into sortable int64 nanosecond timestamps (unparseable rows sort first)"""
+    if df.empty or 'date' not in df.columns:
+        return np.zeros(len(df), dtype=np.int64)
+    
+    dates = df['date'].astype(str)
+    raw = dates + ' ' + df['time'].astype(str) if 'time' in df.columns else dates
+    stamps = pd.to_datetime(raw, errors='coerce')
+    
+    # Fall back to per-value parsing only for rows the inferred format missed
+    missing = stamps.isna() & (dates != '')
+    if missing.any():
+        stamps[missing] = pd.to_datetime(raw[missing], format='mixed', errors='coerce')
+    
+    return stamps.to_numpy(dtype='datetime64[ns]').view(np.int64)
+
+def get_conversation_window(timestamps, oldest=None, size=CONVERSATION_WINDOW):
+    """Return the offset of the first message to show in a contact's timestamp-sorted rows"""
+    if oldest is None:
+        return max(0, len(timestamps) - size)
+    # Start at the oldest message already loaded, so rows appended on refresh never shift the view
+    return int(np.searchsorted(timestamps, oldest, side='left'))
+
+def get_contact_info(df, rows=None, timestamps=None):
+    """Extract unique contacts (excluding myself) within `rows`, keyed by interned contact ID"""
+    if df.empty:
+        return {}
+    
+    rows = np.arange(len(df)) if rows is None else rows
+    timestamps = get_message_timestamps(df) if timestamps is None else timestamps
+    mine, their_ids, row_contacts = get_row_contacts(df)
+    
+    # Only people who appear on a message I did not send count as contacts
+    received_rows = rows[~mine[rows] & (their_ids[rows] >= 0)]
+    contact_ids, first_seen = np.unique(their_ids[received_rows], return_index=True)
+    first_rows = received_rows[first_seen]
+    
+    # Group rows by contact, ordered by timestamp within each conversation; conversations are
+    # row positions into the shared frame rather than copies of the rows
+    positions = rows[np.isin(row_contacts[rows], contact_ids)]
+    positions = positions[np.lexsort((timestamps[positions], row_contacts[positions]))]
+    bounds = np.searchsorted(row_contacts[positions], contact_ids)
+    bounds = np.append(bounds, len(positions))
+    sent_counts = np.add.reduceat(mine[positions].astype(np.int64), bounds[:-1]) if len(positions) else []
+    
+    sender_names = column_or_blank(df, 'sender_name').to_numpy()
+    lead_names = column_or_blank(df, 'lead_name').to_numpy()
+    sender_urls = column_or_blank(df, 'sender_linkedin_url').to_numpy()
+    lead_urls = column_or_blank(df, 'lead_linkedin_url').to_numpy()
+    dates = column_or_blank(df, 'date').to_numpy()
+    times = column_or_blank(df, 'time').to_numpy()
+    
     contacts = {}
+    for i, contact_id in enumerate(contact_ids.tolist()):
+        first = first_rows[i]
+        rows = positions[bounds[i]:bounds[i + 1]]
+        last = rows[-1]
+        contacts[contact_id] = {
+            'id': contact_id,
+            'name': sender_names[first] or lead_names[first],
+            'url': sender_urls[first] or lead_urls[first],
+            'rows': rows,
+            'timestamps': timestamps[rows],
+            'last_contact': f"{dates[last]} {times[last]}",
+            'received_count': len(rows) - int(sent_counts[i]),
+            'sent_count': int(sent_counts[i])
+        }
     
-    for idx, row in df.iterrows():
-        sender_name = row.get('sender_name', '')
-        sender_url = row.get('sender_linkedin_url', '')
-        lead_name = row.get('lead_name', '')
-        lead_url = row.get('lead_linkedin_url', '')
-        
-        # Skip if this is me
-        if is_me(sender_name, sender_url):
-            continue
-        
-        # Determine contact info
-        contact_url = sender_url if sender_url else lead_url
-        contact_name = sender_name if sender_name else lead_name
-        
-        if contact_url and contact_url not in contacts:
-            contacts[contact_url] = {
-                'name': contact_name,
-                'url': contact_url,
-                'messages': [],
-                'last_contact': None,
-                'received_count': 0,
-                'sent_count': 0
-            }
-    
-    # Collect all messages per contact
-    for idx, row in df.iterrows():
-        sender_name = row.get('sender_name', '')
-        sender_url = row.get('sender_linkedin_url', '')
-        lead_url = row.get('lead_linkedin_url', '')
+    return contacts
+
+def get_data_version(df):
+    """Return the version stamp load_data attached to this snapshot"""
+    return df.attrs.get('data_version', 0)
+
+def normalize_name(name):
+    """Fold case and accents and collapse whitespace for name matching"""
+    decomposed = unicodedata.normalize('NFKD', str(name or ''))
+    folded = ''.join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold()
+    return ' '.join(folded.split())
+
+def name_trigrams(name):
+    """Distinct padded character trigrams of a normalized name"""
+    padded = f" {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def single_deletions(token):
+    """The token plus every variant with one character removed"""
+    return {token} | {token[:i] + token[i + 1:] for i in range(len(token))}
+
+def build_name_index(contacts):
+    """Build the contact-name search index, keyed by contact ID so contacts sharing a display name stay distinct"""
+    contact_ids = list(contacts)
+    names = [normalize_name(contacts[contact_id]['name']) for contact_id in contact_ids]
+    
+    # Every word-start suffix, so "doe" finds "jane doe" by binary search
+    prefix_entries = sorted(
+        (name[i:], contact_id)
+        for contact_id, name in enumerate(names)
+        for i in range(len(name))
+        if i == 0 or name[i - 1] == ' '
+    )
+    
+    postings = defaultdict(list)
+    short_postings = defaultdict(list)
+    tokens = defaultdict(set)
+    for contact_id, name in enumerate(names):
+        for gram in name_trigrams(name):
+            postings[gram].append(contact_id)
+        # Every character and bigram, so one- and two-character queries match anywhere in a name
+        for gram in {name[i:i + size] for size in (1, 2) for i in range(len(name) - size + 1)}:
+            short_postings[gram].append(contact_id)
+        for token in name.split():
+            tokens[token].add(contact_id)
+    
+    # Tokens within one edit share a one-deletion variant
+    deletions = defaultdict(set)
+    for token in tokens:
+        for variant in single_deletions(token):
+            deletions[variant].add(token)
+    
+    name_counts = defaultdict(int)
+    for name in names:
+        name_counts[name] += 1
+    
+    message_counts = np.array([len(contacts[contact_id]['rows']) for contact_id in contact_ids], dtype=np.int64)
+    last_seen = np.array([
+        contacts[contact_id]['timestamps'][-1] if len(contacts[contact_id]['timestamps']) else np.iinfo(np.int64).min
+        for contact_id in contact_ids
+    ], dtype=np.int64)
+    
+    def ranks(order):
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.arange(len(order))
+        return rank
+    
+    return {
+        'contact_ids': contact_ids,
+        'names': names,
+        'gram_counts': np.array([len(name_trigrams(name)) for name in names], dtype=np.int32),
+        'message_counts': message_counts,
+        'prefix_terms': [term for term, _ in prefix_entries],
+        'prefix_ids': np.array([contact_id for _, contact_id in prefix_entries], dtype=np.int64),
+        'trigrams': {gram: np.array(ids, dtype=np.int64) for gram, ids in postings.items()},
+        'short_grams': {gram: np.array(ids, dtype=np.int64) for gram, ids in short_postings.items()},
+        'tokens': {token: np.array(sorted(ids), dtype=np.int64) for token, ids in tokens.items()},
+        'deletions': dict(deletions),
+        'shared_names': {name for name, count in name_counts.items() if count > 1},
+        'ranks': {
+            'Name': ranks(np.argsort(np.array(names, dtype=object), kind='stable')),
+            'Messages': ranks(np.argsort(-message_counts, kind='stable')),
+            'Recent': ranks(np.argsort(-last_seen, kind='stable'))
+        }
+    }
+
+def match_typo_tokens(index, q, scores):
+    """Score contacts whose name tokens each match a query token within one edit"""
+    matched = None
+    typos = np.zeros(len(scores), dtype=np.int64)
+    for token in q.split():
+        exact = index['tokens'].get(token, np.empty(0, dtype=np.int64))
+        close = {
+            candidate
+            for variant in single_deletions(token)
+            for candidate in index['deletions'].get(variant, ())
+            if candidate != token
+        }
+        near = np.unique(np.concatenate([exact] + [index['tokens'][c] for c in close]))
+        typos[np.setdiff1d(near, exact, assume_unique=True)] += 1
+        matched = near if matched is None else np.intersect1d(matched, near, assume_unique=True)
+        if not len(matched):
+            return
+    
+    # One typo scores just below a substring hit; more typos rank lower still
+    typo_scores = 1.4 - 0.1 * typos[matched]
+    scores[matched] = np.maximum(scores[matched], typo_scores)
+
+def search_contacts(index, query, limit=CONTACT_MATCH_LIMIT, sort_by=None):
+    """Return up to `limit` contact IDs matching `query` (all matches when `limit` is None), best first or by `sort_by`"""
+    counts = index['message_counts']
+    q = normalize_name(query)
+    if not q:
+        matched = np.arange(len(counts))
+        order = np.argsort(index['ranks'][sort_by or 'Messages'][matched])
+        return [index['contact_ids'][i] for i in matched[order][:limit]]
+    
+    scores = np.zeros(len(counts))
+    
+    # Prefix matches are one contiguous run of the sorted term list
+    terms = index['prefix_terms']
+    lo = bisect_left(terms, q)
+    hi = bisect_left(terms, q + '\uffff', lo)
+    if hi > lo:
+        scores[index['prefix_ids'][lo:hi]] = 2.0
+        for i in np.unique(index['prefix_ids'][lo:hi]):
+            if index['names'][i].startswith(q):
+                scores[i] = 4.0 if index['names'][i] == q else 3.0
+    
+    # Trigram overlap gives substring and fuzzy candidates
+    query_grams = name_trigrams(q)
+    grams = [index['trigrams'][g] for g in query_grams if g in index['trigrams']]
+    if grams:
+        shared = np.bincount(np.concatenate(grams), minlength=len(counts))
+        candidates = np.flatnonzero(shared)
+        similarity = shared[candidates] / (len(query_grams) + index['gram_counts'][candidates] - shared[candidates])
+        fuzzy = similarity >= 0.3
+        scores[candidates[fuzzy]] = np.maximum(scores[candidates[fuzzy]], similarity[fuzzy])
         
-        # Find which contact this message belongs to
-        contact_url = None
-        if is_me(sender_name, sender_url):
-            # This is my message, find the recipient
-            contact_url = lead_url
-            if contact_url in contacts:
-                contacts[contact_url]['sent_count'] += 1
+        # A substring must contain every inner trigram of the query, so only verify those
+        if len(q) >= 3:
+            inner = len({q[i:i + 3] for i in range(len(q) - 2)})
+            possible = candidates[shared[candidates] >= inner]
+            substring = [i for i in possible if scores[i] < 1.5 and q in index['names'][i]]
+            scores[substring] = 1.5
+    
+    # One- and two-character queries have no inner trigram to narrow by; their own postings list every substring match
+    if len(q) < 3:
+        substring = index['short_grams'].get(q, np.empty(0, dtype=np.int64))
+        substring = substring[scores[substring] < 1.5]
+        scores[substring] = 1.5
+    
+    match_typo_tokens(index, q, scores)
+    
+    matched = np.flatnonzero(scores)
+    # By default exact names rank above full-name prefixes, then word prefixes, substrings, one-edit typos and
+    # fuzzy trigram matches, with ties going to the contact with more messages
+    if sort_by:
+        order = np.argsort(index['ranks'][sort_by][matched])
+    else:
+        order = np.lexsort((-counts[matched], -scores[matched]))
+    return [index['contact_ids'][i] for i in matched[order][:limit]]
+
+def contact_label(index, contacts, contact_id):
+    """Picker label; contacts sharing a display name get their profile path appended"""
+    info = contacts[contact_id]
+    label = f"{info['name']} · {len(info['rows'])} messages"
+    if normalize_name(info['name']) in index['shared_names']:
+        label += f" ({canonical_profile_url(info['url']).rsplit('/', 1)[-1]})"
+    return label
+
+def column_or_blank(df, column):
+    """Return a column as strings, or all-blank strings when the sheet lacks it"""
+    if column not in df.columns:
+        return pd.Series('', index=df.index)
+    return df[column].fillna('').astype(str)
+
+def pack_mask(mask):
+    """Store a boolean row mask as a bitset (one bit per row)"""
+    return np.packbits(np.asarray(mask, dtype=bool))
+
+def combine_bitsets(bitsets, op=np.bitwise_and):
+    """Fold bitsets together with a bitwise operator (AND by default, or np.bitwise_or)"""
+    result = bitsets[0]
+    for bits in bitsets[1:]:
+        result = op(result, bits)
+    return result
+
+def bitset_test(bits, positions):
+    """Test the bits at the given row positions without unpacking the whole set"""
+    positions = np.asarray(positions, dtype=np.int64)
+    return ((bits[positions >> 3] >> (7 - (positions & 7))) & 1).astype(bool)
+
+def build_message_index(df, timestamps, in_partition, attachment_rows):
+    """Timestamp order and filter bitsets for one partition's rows"""
+    n = len(df)
+    rows = np.flatnonzero(in_partition)
+    is_mine = df['sender_owner'].to_numpy() >= 0
+    shared = np.zeros(n, dtype=bool)
+    shared[attachment_rows] = True
+    order = rows[np.argsort(timestamps[rows], kind='stable')]
+    return {
+        'size': n,
+        'timestamps': timestamps,
+        'order': order,
+        'sorted_timestamps': timestamps[order],
+        'filters': {
+            "All Messages": pack_mask(in_partition),
+            "Sent by Me": pack_mask(in_partition & is_mine),
+            "Received": pack_mask(in_partition & ~is_mine),
+            "With Attachments": pack_mask(in_partition & shared)
+        }
+    }
+
+@metrics.cached_resource(max_entries=4)
+def get_owner_indexes(_df, data_version):
+    """Contacts, name index, attachment index and message filters for every owner partition, built together"""
+    timestamps = get_message_timestamps(_df)
+    owners = _df['owner'].to_numpy()
+    attachments = get_attachment_records(_df)
+    partitions = {}
+    for owner in [ALL_OWNERS] + list(range(len(OWNER_PROFILES))):
+        in_partition = np.ones(len(_df), dtype=bool) if owner == ALL_OWNERS else owners == owner
+        rows = np.flatnonzero(in_partition)
+        contacts = get_contact_info(_df, rows, timestamps)
+        attachment_index = build_attachment_index(attachments, in_partition)
+        partitions[owner] = {
+            'rows': rows,
+            'contacts': contacts,
+            'name_index': build_name_index(contacts),
+            'attachment_index': attachment_index,
+            'message_index': build_message_index(_df, timestamps, in_partition, attachment_index['has_attachment'])
+        }
+    return partitions
+
+def query_term(field, value, quoted=False):
+    """Plan leaf for one search term; unknown fields are searched as literal text"""
+    if field and field.lower() not in QUERY_FIELDS:
+        value, field = f"{field}:{value}", None
+    field = field.lower() if field else None
+    if field == 'from':
+        name = normalize_name(value)
+        return ('from_me',) if name == 'me' else ('from', name)
+    if field in ('after', 'before'):
+        try:
+            stamp = pd.Timestamp(value)
+        except ValueError:
+            raise ValueError(f'"{value}" is not a date')
+        return (field, stamp.to_datetime64().astype('datetime64[ns]').view(np.int64).item())
+    if field == 'has':
+        kind = value.lower()
+        if kind not in ('attachment', 'link', 'file'):
+            raise ValueError(f'has: expects attachment, link or file, not "{value}"')
+        return ('has', kind)
+    words = re.findall(r'\w+', value.casefold())
+    if not words:
+        raise ValueError(f'"{value}" has nothing to search for')
+    return ('word', words[0]) if len(words) == 1 and not quoted else ('phrase', value.casefold())
+
+@metrics.cached_resource(max_entries=256)
+def compile_query(search):
+    """Parse a search string into a nested plan of ('and' | 'or', parts), ('not', part) and term leaves; ValueError if malformed"""
+    tokens = []
+    position = 0
+    search = search.strip()
+    while position < len(search):
+        match = QUERY_TOKEN.match(search, position)
+        if not match or match.end() == position:
+            raise ValueError(f"unexpected character at position {position + 1}")
+        position = match.end()
+        opening, closing, negated, field, phrase, word = match.groups()
+        if opening or closing:
+            tokens.append(opening or closing)
+        elif phrase is None and not negated and not field and word in ('AND', 'OR', 'NOT'):
+            tokens.append(word)
         else:
-            # This is their message
-            contact_url = sender_url if sender_url else lead_url
-            if contact_url in contacts:
-                contacts[contact_url]['received_count'] += 1
-        
-        if contact_url in contacts:
-            contacts[contact_url]['messages'].append(row)
-            contacts[contact_url]['last_contact'] = f"{row.get('date', '')} {row.get('time', '')}"
-    
-    return contacts
+            term = query_term(field, word if phrase is None else phrase, quoted=phrase is not None)
+            tokens.append(('not', term) if negated else term)
+    
+    # Adjacent terms are ANDed; OR binds looser than AND, NOT or a leading - negates, and parentheses group
+    def parse_or(i):
+        parts, i = parse_and(i)
+        parts = [parts]
+        while i < len(tokens) and tokens[i] == 'OR':
+            part, i = parse_and(i + 1)
+            parts.append(part)
+        return (parts[0] if len(parts) == 1 else ('or', tuple(parts))), i
+    
+    def parse_and(i):
+        parts = []
+        while i < len(tokens) and tokens[i] not in ('OR', ')'):
+            if tokens[i] == 'AND':
+                i += 1
+            part, i = parse_unary(i)
+            parts.append(part)
+        if not parts:
+            raise ValueError("expected a search term")
+        return (parts[0] if len(parts) == 1 else ('and', tuple(parts))), i
+    
+    def parse_unary(i):
+        if i >= len(tokens):
+            raise ValueError("query ends early")
+        token = tokens[i]
+        if token == 'NOT':
+            part, i = parse_unary(i + 1)
+            return ('not', part), i
+        if token == '(':
+            part, i = parse_or(i + 1)
+            if i >= len(tokens) or tokens[i] != ')':
+                raise ValueError("missing )")
+            return part, i + 1
+        if isinstance(token, tuple):
+            return token, i + 1
+        raise ValueError(f"unexpected {token}")
+    
+    plan, i = parse_or(0)
+    if i < len(tokens):
+        raise ValueError(f"unexpected {tokens[i]}")
+    return plan
+
+def new_text_index():
+    """Empty inverted index from casefolded words to row positions, as postings segments"""
+    return {'size': 0, 'segments': []}
+
+def text_segment(words, rows):
+    """Postings segment over a sorted vocabulary from parallel word and row-position arrays"""
+    codes, vocabulary = pd.factorize(words)
+    vocabulary = np.asarray(vocabulary, dtype=str)
+    
+    # Renumber words in sorted vocabulary order and group postings by word, so a prefix
+    # resolves to one contiguous run of postings by binary search
+    ranks = np.argsort(vocabulary, kind='stable')
+    codes = np.argsort(ranks)[codes]
+    order = np.lexsort((rows, codes))
+    return {
+        'vocabulary': vocabulary[ranks],
+        'bounds': np.searchsorted(codes[order], np.arange(len(vocabulary) + 1)),
+        'postings': rows[order]
+    }
+
+def append_text_index(index, rows, offset):
+    """Return the index extended with a segment for the messages and sender names of `rows`, which start at `offset`"""
+    text = column_or_blank(rows, 'message') + ' ' + column_or_blank(rows, 'sender_name')
+    words = text.str.casefold().str.findall(r'\w+')
+    positions = np.repeat(np.arange(offset, offset + len(rows)), words.str.len().to_numpy())
+    segments = index['segments'] + [text_segment(words.explode().dropna().to_numpy(dtype=str), positions)]
+    if len(segments) > TEXT_INDEX_MAX_SEGMENTS:
+        # Merged from the postings alone, so spilled message text is never read back
+        words = np.concatenate([np.repeat(segment['vocabulary'], np.diff(segment['bounds'])) for segment in segments])
+        positions = np.concatenate([segment['postings'] for segment in segments])
+        segments = [text_segment(words, positions)]
+    return {'size': offset + len(rows), 'segments': segments}
+
+@metrics.cached_resource(max_entries=2)
+def get_text_index(_df, data_version):
+    """Word-search index for this data version, reusing the one built during sync"""
+    version, index = get_sync_state(SPREADSHEET_ID, SHEET_NAME)['text_index']
+    if version != data_version:
+        index = append_text_index(new_text_index(), _df.assign(message=message_text(_df)), 0)
+    return index
+
+def phrase_candidates(phrase, text_index, size):
+    """Row mask of rows with, for each word of `phrase`, an indexed word containing it"""
+    mask = np.ones(size, dtype=bool)
+    for word in set(re.findall(r'\w+', phrase)):
+        found = np.zeros(size, dtype=bool)
+        for segment in text_index['segments']:
+            bounds = segment['bounds']
+            # A phrase's first and last words may be cut from longer words, so each word matches every
+            # vocabulary entry containing it rather than one prefix run
+            hits = np.flatnonzero(np.char.find(segment['vocabulary'], word) >= 0)
+            starts = bounds[hits]
+            lengths = bounds[hits + 1] - starts
+            offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+            found[segment['postings'][np.repeat(starts, lengths) + offsets]] = True
+        mask &= found
+    return mask
+
+def match_query_term(df, term, indexes):
+    """Boolean row mask for one plan leaf"""
+    kind = term[0]
+    mask = np.zeros(len(df), dtype=bool)
+    if kind == 'word':
+        for segment in indexes['text']['segments']:
+            vocabulary = segment['vocabulary']
+            low = np.searchsorted(vocabulary, term[1], side='left')
+            high = np.searchsorted(vocabulary, term[1] + chr(0x10FFFF), side='left')
+            bounds = segment['bounds']
+            mask[segment['postings'][bounds[low]:bounds[high]]] = True
+    elif kind == 'phrase':
+        # Only rows holding every word of the phrase can contain it; their text is read back in
+        # batches, so spilled messages are never all in memory at once
+        candidates = np.flatnonzero(phrase_candidates(term[1], indexes['text'], len(df)))
+        columns = df[['message', 'sender_name', 'message_store']]
+        for start in range(0, len(candidates), PHRASE_BATCH_ROWS):
+            batch = candidates[start:start + PHRASE_BATCH_ROWS]
+            rows = with_message_text(columns, batch)
+            mask[batch] = (
+                column_or_blank(rows, 'message').str.contains(term[1], case=False, regex=False) |
+                column_or_blank(rows, 'sender_name').str.contains(term[1], case=False, regex=False)
+            ).to_numpy(dtype=bool)
+    elif kind == 'from':
+        codes, names = pd.factorize(column_or_blank(df, 'sender_name'))
+        matches = [i for i, name in enumerate(names) if term[1] in normalize_name(name)]
+        mask = np.isin(codes, matches)
+    elif kind == 'from_me':
+        mask = df['sender_owner'].to_numpy() >= 0
+    elif kind in ('after', 'before'):
+        message_index = indexes['messages']
+        # Undated rows sort first as the int64 minimum and match neither side
+        sorted_timestamps = message_index['sorted_timestamps']
+        dated = np.searchsorted(sorted_timestamps, np.iinfo(np.int64).min, side='right')
+        split = max(dated, np.searchsorted(sorted_timestamps, term[1], side='left'))
+        mask[message_index['order'][split:] if kind == 'after' else message_index['order'][dated:split]] = True
+    elif kind == 'has':
+        attachment_index = indexes['attachments']
+        if term[1] == 'attachment':
+            mask[attachment_index['has_attachment']] = True
+        else:
+            for domain, rows in attachment_index['domain_rows'].items():
+                if (domain == FILE_DOMAIN) == (term[1] == 'file'):
+                    mask[rows] = True
+    return mask
+
+def execute_query(df, plan, indexes):
+    """Evaluate a compiled plan into a row bitset"""
+    kind = plan[0]
+    if kind in ('and', 'or'):
+        bitsets = [execute_query(df, part, indexes) for part in plan[1]]
+        return combine_bitsets(bitsets, np.bitwise_and if kind == 'and' else np.bitwise_or)
+    if kind == 'not':
+        return np.bitwise_not(execute_query(df, plan[1], indexes))
+    return pack_mask(match_query_term(df, plan, indexes))
+
+@metrics.cached_resource(max_entries=64)
+def get_search_bitset(_df, data_version, plan):
+    """Bitset of rows matching a compiled search plan, memoized per data version"""
+    everything = get_owner_indexes(_df, data_version)[ALL_OWNERS]
+    indexes = {
+        'text': get_text_index(_df, data_version),
+        'messages': everything['message_index'],
+        'attachments': everything['attachment_index']
+    }
+    return execute_query(_df, plan, indexes)
+
+def date_range_bounds(date_range):
+    """Convert a date_input range into [start, end) nanosecond bounds, or None when unset"""
+    if not date_range:
+        return None
+    start = np.datetime64(date_range[0], 'ns')
+    end = np.datetime64(date_range[-1], 'ns') + np.timedelta64(1, 'D')
+    return start.view(np.int64), end.view(np.int64)
+
+def get_candidate_rows(message_index, contacts, contact_ids=(), bounds=None):
+    """Timestamp-ordered row positions for the selected contacts and date window, found by binary search"""
+    if not contact_ids:
+        order = message_index['order']
+        if bounds is None:
+            return order
+        lo, hi = np.searchsorted(message_index['sorted_timestamps'], bounds, side='left')
+        return order[lo:hi]
+    
+    parts = []
+    for contact_id in contact_ids:
+        rows = contacts[contact_id]['rows']
+        if bounds is not None:
+            lo, hi = np.searchsorted(contacts[contact_id]['timestamps'], bounds, side='left')
+            rows = rows[lo:hi]
+        parts.append(rows)
+    rows = np.unique(np.concatenate(parts))
+    return rows[np.argsort(message_index['timestamps'][rows], kind='stable')]
+
+def select_rows(message_index, bitset, candidates=None, newest_first=True):
+    """Candidate row positions (all rows by default) whose bit is set, keeping timestamp order"""
+    candidates = message_index['order'] if candidates is None else candidates
+    selected = candidates[bitset_test(bitset, candidates)]
+    return selected[::-1] if newest_first else selected
 
 def create_message_chart(df):
     """Create a message activity chart"""
@@ -492,7 +2128,21 @@ def create_message_chart(df):
     
     return fig
 
+def render_html(markup):
+    """Emit raw HTML markup, counting its size toward the current view's page weight"""
+    metrics.inc('linkup_html_bytes_total', len(markup.encode('utf-8')), view=st.session_state.get("view_mode", "none"))
+    st.markdown(markup, unsafe_allow_html=True)
+
 def main():
+    # Page configuration
+    st.set_page_config(
+        page_title="LinkedIn Chat Viewer",
+        page_icon="💬",
+        layout="wide",
+        initial_sidebar_state="expanded"
+    )
+    render_html(PAGE_CSS)
+    
     st.title("💬 LinkedIn Chat History Analytics")
     st.markdown("**Professional conversation management and insights**")
     st.markdown("---")
@@ -501,14 +2151,18 @@ def main():
     with st.sidebar:
         st.header("🔐 Authentication")
         
-        uploaded_file = st.file_uploader(
-            "Upload Service Account JSON",
-            type=['json'],
-            help="Upload your Google Service Account credentials JSON file"
-        )
+        # Server-side credentials connect every session; otherwise each user uploads their own
+        credentials_json = read_server_credentials()
+        if credentials_json is None:
+            uploaded_file = st.file_uploader(
+                "Upload Service Account JSON",
+                type=['json'],
+                help="Upload your Google Service Account credentials JSON file"
+            )
+            if uploaded_file is not None:
+                credentials_json = uploaded_file.read().decode('utf-8')
         
-        if uploaded_file is not None:
-            credentials_json = uploaded_file.read().decode('utf-8')
+        if credentials_json is not None:
             client = init_google_sheets(credentials_json)
             
             if client:
@@ -517,16 +2171,32 @@ def main():
                 # My Profile Info
                 st.markdown("---")
                 st.markdown("### 👤 Your Profile")
-                st.markdown(f"""
-                **{MY_PROFILE['name']}**  
-                [View LinkedIn Profile →]({MY_PROFILE['url']})
-                """)
+                owner = 0
+                if len(OWNER_PROFILES) > 1:
+                    owner = st.selectbox(
+                        "Viewing as",
+                        options=list(range(len(OWNER_PROFILES))) + [ALL_OWNERS],
+                        format_func=lambda key: "All profiles" if key == ALL_OWNERS else OWNER_PROFILES[key]['name'],
+                        key="owner"
+                    )
+                for profile in (OWNER_PROFILES if owner == ALL_OWNERS else [OWNER_PROFILES[owner]]):
+                    st.markdown(f"""
+                    **{profile['name']}**  
+                    [View LinkedIn Profile →]({profile['url']})
+                    """)
                 
                 st.markdown("---")
                 
                 # Refresh button
                 if st.button("🔄 Refresh Data", use_container_width=True):
-                    st.cache_data.clear()
+                    expire_snapshot()
+                    st.rerun()
+                if st.button(
+                    "♻️ Full Resync",
+                    use_container_width=True,
+                    help="Re-read the whole sheet, picking up edited and deleted rows"
+                ):
+                    expire_snapshot(full=True)
                     st.rerun()
                 
                 st.markdown("---")
@@ -564,50 +2234,72 @@ def main():
         st.warning("No data found. Please check your spreadsheet and permissions.")
         return
     
-    # Get contact information
-    contacts = get_contact_info(df)
+    # Switching owners just picks another prebuilt partition
+    partitions = get_owner_indexes(df, get_data_version(df))
+    partition = partitions[owner]
+    contacts = partition['contacts']
+    name_index = partition['name_index']
+    
+    # Everything synced after this visitor's watermark is new to them
+    mark = visit_mark(df, partitions[ALL_OWNERS]['message_index'])
+    last_visit = start_visit(mark)
+    new_rows = get_new_rows(df, last_visit, partition['message_index'], owner)
+    unread = count_unread(df, new_rows)
+    
+    # Stats are materialized per data version at sync time
+    stats = get_overview_stats(df, owner)
+    
+    with st.sidebar:
+        if stats['active_days']:
+            st.markdown(f"**{stats['per_day']:.1f}** messages per active day over **{stats['active_days']}** days")
+        st.markdown(f"📎 **{stats['attachments']}** messages with attachments")
+        if stats['top_contacts']:
+            st.markdown("**Top contacts**")
+            st.markdown("\n".join(
+                f"{rank}. {contacts[contact_id]['name']} · {count} messages"
+                for rank, (contact_id, count) in enumerate(stats['top_contacts'], 1)
+                if contact_id in contacts
+            ))
     
     # Display Statistics
     st.markdown("### 📈 Overview Statistics")
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.markdown(f"""
+        render_html(f"""
         <div class="stat-box">
-            <div class="stat-number">{len(df)}</div>
+            <div class="stat-number">{stats['total']}</div>
             <div class="stat-label">Total Messages</div>
         </div>
-        """, unsafe_allow_html=True)
+        """)
     
     with col2:
-        st.markdown(f"""
+        render_html(f"""
         <div class="stat-box">
-            <div class="stat-number">{len(contacts)}</div>
+            <div class="stat-number">{stats['active_contacts']}</div>
             <div class="stat-label">Active Contacts</div>
         </div>
-        """, unsafe_allow_html=True)
+        """)
     
     with col3:
-        my_messages = sum(1 for _, row in df.iterrows() if is_me(row.get('sender_name', ''), row.get('sender_linkedin_url', '')))
-        st.markdown(f"""
+        render_html(f"""
         <div class="stat-box">
-            <div class="stat-number">{my_messages}</div>
+            <div class="stat-number">{stats['sent']}</div>
             <div class="stat-label">Sent by You</div>
         </div>
-        """, unsafe_allow_html=True)
+        """)
     
     with col4:
-        received_messages = len(df) - my_messages
-        st.markdown(f"""
+        render_html(f"""
         <div class="stat-box">
-            <div class="stat-number">{received_messages}</div>
+            <div class="stat-number">{stats['received']}</div>
             <div class="stat-label">Received</div>
         </div>
-        """, unsafe_allow_html=True)
+        """)
     
     # Message activity chart
     with st.expander("📊 View Message Activity Chart", expanded=False):
-        chart = create_message_chart(df)
+        chart = create_message_chart(df.iloc[partition['rows']])
         if chart:
             st.plotly_chart(chart, use_container_width=True)
     
@@ -617,28 +2309,35 @@ def main():
     st.markdown("### 🔍 Select View Mode")
     view_mode = st.radio(
         "",
-        ["📇 All Contacts", "👤 Contact Conversation", "📝 All Messages"],
+        ["📇 All Contacts", "🆕 New Since Last Visit", "👤 Contact Conversation", "📝 All Messages", "📎 Shared Content"],
         horizontal=True,
-        label_visibility="collapsed"
+        label_visibility="collapsed",
+        key="view_mode"
     )
     
     st.markdown("---")
     
     if view_mode == "📇 All Contacts":
-        show_all_contacts(contacts)
+        show_all_contacts(contacts, name_index, unread)
+    elif view_mode == "🆕 New Since Last Visit":
+        show_new_messages(df, contacts, new_rows, unread, last_visit, mark)
     elif view_mode == "👤 Contact Conversation":
-        show_individual_contact(contacts)
+        show_individual_contact(contacts, df, name_index)
+    elif view_mode == "📝 All Messages":
+        show_similar_messages(df, partition['rows'])
+        show_all_messages(df, contacts, name_index, partition['message_index'])
     else:
-        show_all_messages(df)
+        show_similar_messages(df, partition['rows'])
+        show_shared_content(df, partition['attachment_index'])
 
-def show_all_contacts(contacts):
+def show_all_contacts(contacts, name_index, unread):
     """Display all contacts in card format"""
     st.header("📇 All Contacts")
     st.markdown("*Click on any contact card to view their profile*")
     st.markdown("")
     
     if not contacts:
-        st.markdown('<div class="no-data-message">📭 No contacts found.</div>', unsafe_allow_html=True)
+        render_html('<div class="no-data-message">📭 No contacts found.</div>')
         return
     
     # Search and sort filters
@@ -646,26 +2345,16 @@ def show_all_contacts(contacts):
     with col1:
         search = st.text_input("🔍 Search contacts by name", "", key="contact_search")
     with col2:
-        sort_by = st.selectbox("Sort by", ["Name", "Messages", "Recent"])
-    
-    # Filter contacts
-    filtered_contacts = {
-        url: info for url, info in contacts.items()
-        if not search or search.lower() in info['name'].lower()
-    }
-    
-    # Sort contacts
-    if sort_by == "Messages":
-        filtered_contacts = dict(sorted(
-            filtered_contacts.items(),
-            key=lambda x: len(x[1]['messages']),
-            reverse=True
-        ))
-    elif sort_by == "Name":
-        filtered_contacts = dict(sorted(
-            filtered_contacts.items(),
-            key=lambda x: x[1]['name']
-        ))
+        sort_by = st.selectbox("Sort by", ["Best Match", "Name", "Messages", "Recent"])
+    
+    # Filter and sort through the precomputed name index
+    matches = search_contacts(
+        name_index,
+        search,
+        limit=None,
+        sort_by=None if sort_by == "Best Match" else sort_by
+    )
+    filtered_contacts = {contact_id: contacts[contact_id] for contact_id in matches}
     
     st.markdown(f"**Showing {len(filtered_contacts)} contacts**")
     st.markdown("")
@@ -673,19 +2362,19 @@ def show_all_contacts(contacts):
     # Display in columns
     cols = st.columns(2)
     
-    for idx, (url, info) in enumerate(filtered_contacts.items()):
+    for idx, (contact_id, info) in enumerate(filtered_contacts.items()):
         col = cols[idx % 2]
         
-        message_count = len(info['messages'])
-        initials = get_initials(info['name'])
+        message_count = len(info['rows'])
+        initials = escape_html(get_initials(info['name']))
         
         with col:
-            st.markdown(f"""
+            render_html(f"""
             <div class="contact-card">
                 <div style="display: flex; align-items: center; margin-bottom: 20px;">
                     <div class="profile-badge">{initials}</div>
                     <div>
-                        <div class="contact-name">{info['name']}</div>
+                        <div class="contact-name">{escape_html(info['name'])}</div>
                     </div>
                 </div>
                 <div class="contact-stats">
@@ -698,49 +2387,142 @@ def show_all_contacts(contacts):
                     <div class="contact-stat-item">
                         📥 <strong>{info['received_count']}</strong> received
                     </div>
+                    {f'<div class="contact-stat-item unread">🆕 <strong>{unread[contact_id]}</strong> new</div>' if unread.get(contact_id) else ''}
                 </div>
                 <p style="margin-top: 15px; opacity: 0.9;">
-                    <strong>Last Contact:</strong> {info['last_contact']}
+                    <strong>Last Contact:</strong> {escape_html(info['last_contact'])}
                 </p>
                 <div class="linkedin-badge">
-                    <a href="{url}" target="_blank" style="color: white; text-decoration: none;">
+                    <a href="{profile_href(info['url'])}" target="_blank" style="color: white; text-decoration: none;">
                         🔗 View LinkedIn Profile →
                     </a>
                 </div>
             </div>
-            """, unsafe_allow_html=True)
+            """)
 
-def show_individual_contact(contacts):
+def show_new_messages(df, contacts, new_rows, unread, last_visit, mark):
+    """Display the messages added since the visitor's last visit, with who they came from"""
+    st.header("🆕 New Since Last Visit")
+    st.markdown(f"*Messages synced since {datetime.fromtimestamp(last_visit['seen_at']).strftime('%Y-%m-%d %H:%M')}*")
+    if last_visit.get('untracked'):
+        st.info(
+            "You are not signed in and this browser had no visitor cookie, so this visit starts your history "
+            "and nothing is marked new yet. Visits are tracked from the next page load in this browser; "
+            "private windows and browsers that block cookies start over each time."
+        )
+    st.markdown("")
+    
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        st.markdown(f"**{len(new_rows)} new messages from {len(unread)} contacts**")
+    with col2:
+        st.button(
+            "✔ Mark all as read",
+            use_container_width=True,
+            on_click=st.session_state.update,
+            args=({'last_visit': mark},),
+            disabled=not len(new_rows)
+        )
+    
+    if not len(new_rows):
+        render_html('<div class="no-data-message">📭 Nothing new since your last visit.</div>')
+        return
+    
+    # Contacts with the most unread messages first
+    if unread:
+        st.markdown("**Unread by contact**")
+        st.dataframe(
+            pd.DataFrame(
+                [(contacts[contact_id]['name'], count) for contact_id, count in unread.items() if contact_id in contacts],
+                columns=['Contact', 'New messages']
+            ).sort_values('New messages', ascending=False),
+            hide_index=True,
+            use_container_width=True
+        )
+    
+    st.markdown("---")
+    
+    page = paginate(new_rows, "new_page")
+    rows = with_message_text(df, page)
+    for i, position in enumerate(page.tolist()):
+        render_message_card(rows.iloc[i], position)
+
+def load_older_messages(cursor_key, timestamps, start):
+    """Move a conversation's cursor back by one window"""
+    st.session_state[cursor_key] = timestamps[max(0, start - CONVERSATION_WINDOW)]
+
+def show_individual_contact(contacts, df, name_index):
     """Display messages for a specific contact"""
     st.header("👤 Contact Conversation")
     st.markdown("*View detailed conversation history with a specific contact*")
     st.markdown("")
     
     if not contacts:
-        st.markdown('<div class="no-data-message">📭 No contacts found.</div>', unsafe_allow_html=True)
+        render_html('<div class="no-data-message">📭 No contacts found.</div>')
         return
     
-    # Contact selection
-    contact_options = {info['name']: url for url, info in contacts.items()}
+    # Contact selection: only the best matches for the query reach the browser
+    query = st.text_input("🔍 Find a contact", "", key="contact_picker_search", placeholder="Start typing a name...")
+    matches = search_contacts(name_index, query)
+    
+    if not matches:
+        render_html('<div class="no-data-message">📭 No contacts match your search.</div>')
+        return
     
-    selected_name = st.selectbox(
+    selected_id = st.selectbox(
         "Select a contact to view conversation",
-        options=list(contact_options.keys())
+        options=matches,
+        format_func=lambda contact_id: contact_label(name_index, contacts, contact_id)
     )
     
-    selected_url = contact_options[selected_name]
-    contact_info = contacts[selected_url]
+    contact_info = contacts[selected_id]
     
     # Display contact header
-    message_count = len(contact_info['messages'])
-    initials = get_initials(contact_info['name'])
+    message_count = len(contact_info['rows'])
+    render_html(contact_header_html(contact_info))
+    
+    st.markdown("### 💬 Conversation History")
+    
+    # Open at the most recent window; "load older" moves the cursor back one window
+    timestamps = contact_info['timestamps']
+    cursor_key = f"conversation_oldest_{selected_id}"
+    start = get_conversation_window(timestamps, st.session_state.get(cursor_key))
+    
+    if start > 0:
+        st.button(
+            f"⬆️ Load older messages ({start} more)",
+            key=f"load_older_{selected_id}",
+            on_click=load_older_messages,
+            args=(cursor_key, timestamps, start)
+        )
+    
+    st.markdown(f"*Showing {message_count - start} of {message_count} messages*")
+    
+    messages = with_message_text(df, contact_info['rows'][start:])
     
-    st.markdown(f"""
+    current_date = None
+    
+    # Display messages
+    for _, msg in messages.iterrows():
+        date = msg.get('date', '')
+        
+        # Date divider
+        if date and date != current_date:
+            render_html(date_divider_html(date))
+            current_date = date
+        
+        render_html(conversation_message_html(msg))
+
+def contact_header_html(contact_info):
+    """Contact banner with initials, message counts and profile link"""
+    message_count = len(contact_info['rows'])
+    initials = escape_html(get_initials(contact_info['name']))
+    return f"""
     <div class="contact-header">
         <div style="display: flex; align-items: center; margin-bottom: 20px;">
             <div class="profile-badge" style="width: 70px; height: 70px; font-size: 2em;">{initials}</div>
             <div>
-                <h2 style="margin: 0;">{contact_info['name']}</h2>
+                <h2 style="margin: 0;">{escape_html(contact_info['name'])}</h2>
                 <p style="margin: 5px 0 0 0; opacity: 0.9;">LinkedIn Professional</p>
             </div>
         </div>
@@ -756,65 +2538,50 @@ def show_individual_contact(contacts):
             </div>
         </div>
         <div class="linkedin-badge">
-            <a href="{contact_info['url']}" target="_blank" style="color: white; text-decoration: none;">
+            <a href="{profile_href(contact_info['url'])}" target="_blank" style="color: white; text-decoration: none;">
                 🔗 View LinkedIn Profile →
             </a>
         </div>
     </div>
-    """, unsafe_allow_html=True)
-    
-    st.markdown("### 💬 Conversation History")
-    
-    # Sort messages by date and time
-    messages = sorted(
-        contact_info['messages'],
-        key=lambda x: (x.get('date', ''), x.get('time', ''))
-    )
-    
-    current_date = None
-    
-    # Display messages
-    for msg in messages:
-        sender_name = msg.get('sender_name', '')
-        sender_url = msg.get('sender_linkedin_url', '')
-        message = msg.get('message', '')
-        date = msg.get('date', '')
-        time = msg.get('time', '')
-        shared_content = msg.get('shared_content', '')
-        
-        # Date divider
-        if date and date != current_date:
-            st.markdown(f'<div class="conversation-date-divider">{date}</div>', unsafe_allow_html=True)
-            current_date = date
-        
-        is_my_message = is_me(sender_name, sender_url)
-        
-        if is_my_message:
-            # My message (right-aligned, colored)
-            st.markdown(f"""
-            <div class="message-sent">
-                <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 10px;">
-                    <strong>You</strong>
-                    <span class="message-time">🕐 {time}</span>
-                </div>
-                <p style="margin: 0; line-height: 1.6;">{message}</p>
-                {f'<div class="shared-content-badge" style="background: rgba(255,255,255,0.2); color: white;">📎 {shared_content}</div>' if shared_content else ''}
+    """
+
+def date_divider_html(date):
+    """Divider shown above the first message of each day in a conversation"""
+    return f'<div class="conversation-date-divider">{escape_html(date)}</div>'
+
+def conversation_message_html(msg):
+    """Chat bubble for one message: right-aligned and colored when sent by me, left-aligned otherwise"""
+    sender_name = escape_html(msg.get('sender_name', ''))
+    message = escape_html(msg.get('message', ''))
+    time = escape_html(msg.get('time', ''))
+    shared_content = escape_html(msg.get('shared_content', ''))
+    
+    if msg['sender_owner'] >= 0:
+        # My message (right-aligned, colored)
+        return f"""
+        <div class="message-sent">
+            <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 10px;">
+                <strong>You</strong>
+                <span class="message-time">🕐 {time}</span>
             </div>
-            """, unsafe_allow_html=True)
-        else:
-            # Their message (left-aligned)
-            st.markdown(f"""
-            <div class="message-received">
-                <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 10px;">
-                    <strong style="color: #667eea;">{sender_name}</strong>
-                    <span class="message-time">🕐 {time}</span>
-                </div>
-                <p style="margin: 0; color: #333; line-height: 1.6;">{message}</p>
-                {f'<div class="shared-content-badge">📎 {shared_content}</div>' if shared_content else ''}
+            <p style="margin: 0; line-height: 1.6;">{message}</p>
+            {f'<div class="shared-content-badge" style="background: rgba(255,255,255,0.2); color: white;">📎 {shared_content}</div>' if shared_content else ''}
+        </div>
+        """
+    
+    # Their message (left-aligned)
+    return f"""
+        <div class="message-received">
+            <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 10px;">
+                <strong style="color: #667eea;">{sender_name}</strong>
+                <span class="message-time">🕐 {time}</span>
             </div>
-            """, unsafe_allow_html=True)
+            <p style="margin: 0; color: #333; line-height: 1.6;">{message}</p>
+            {f'<div class="shared-content-badge">📎 {shared_content}</div>' if shared_content else ''}
+        </div>
+        """
 
-def show_all_messages(df):
+def show_all_messages(df, contacts, name_index, message_index):
     """Display all messages in bulk card format with white background"""
     st.header("📝 All Messages")
     st.markdown("*Complete message archive with advanced filtering*")
@@ -823,92 +2590,226 @@ def show_all_messages(df):
     # Search and filter controls
     col1, col2, col3 = st.columns([2, 1, 1])
     with col1:
-        search = st.text_input("🔍 Search in messages", "", key="message_search", placeholder="Type to search...")
+        search = st.text_input(
+            "🔍 Search in messages",
+            "",
+            key="message_search",
+            placeholder='e.g. from:"Jane" AND (pricing OR quote) -unsubscribe after:2024-01-01',
+            help='Words match by prefix; use "quotes" for phrases. Combine with AND, OR, NOT or -, group with '
+                 '( ), and filter with from:name, from:me, after:/before:YYYY-MM-DD or has:attachment, has:link, has:file.'
+        )
     with col2:
         show_only = st.selectbox("Filter by", ["All Messages", "Sent by Me", "Received", "With Attachments"])
     with col3:
         sort_order = st.selectbox("Sort", ["Newest First", "Oldest First"])
     
-    # Filter messages
-    filtered_df = df.copy()
+    data_version = get_data_version(df)
     
-    if search:
-        filtered_df = filtered_df[
-            filtered_df['message'].str.contains(search, case=False, na=False) |
-            filtered_df['sender_name'].str.contains(search, case=False, na=False)
-        ]
+    # Date-range and contact filters
+    col1, col2, col3 = st.columns([1, 1, 2])
+    with col1:
+        sorted_timestamps = message_index['sorted_timestamps']
+        dated = sorted_timestamps[sorted_timestamps != np.iinfo(np.int64).min]
+        date_range = st.date_input(
+            "📅 Date range",
+            value=(),
+            min_value=pd.Timestamp(dated[0]).date() if len(dated) else None,
+            max_value=pd.Timestamp(dated[-1]).date() if len(dated) else None,
+            key="message_date_range"
+        )
+    with col2:
+        contact_query = st.text_input("👥 Find contacts", "", key="message_contact_search", placeholder="Type a name...")
+    with col3:
+        # Keep current picks available alongside the finder's top matches
+        picked = [contact_id for contact_id in st.session_state.get("message_contacts", []) if contact_id in contacts]
+        options = picked + [contact_id for contact_id in search_contacts(name_index, contact_query) if contact_id not in picked]
+        contact_ids = st.multiselect(
+            "Contacts",
+            options=options,
+            default=picked,
+            format_func=lambda contact_id: contact_label(name_index, contacts, contact_id),
+            key="message_contacts"
+        )
     
-    if show_only == "Sent by Me":
-        filtered_df = filtered_df[filtered_df.apply(lambda row: is_me(row.get('sender_name', ''), row.get('sender_linkedin_url', '')), axis=1)]
-    elif show_only == "Received":
-        filtered_df = filtered_df[filtered_df.apply(lambda row: not is_me(row.get('sender_name', ''), row.get('sender_linkedin_url', '')), axis=1)]
-    elif show_only == "With Attachments":
-        filtered_df = filtered_df[filtered_df['shared_content'].notna() & (filtered_df['shared_content'] != '')]
+    # Narrow to candidate rows through the sorted indexes, then test the cached bitsets on those rows only
+    candidates = get_candidate_rows(message_index, contacts, contact_ids, date_range_bounds(date_range))
+    bitsets = [message_index['filters'][show_only]]
+    if search.strip():
+        try:
+            bitsets.append(get_search_bitset(df, data_version, compile_query(search)))
+        except ValueError as e:
+            st.warning(f"Couldn't understand the search ({e}); matching it as plain text instead.")
+            bitsets.append(get_search_bitset(df, data_version, ('phrase', search.strip().casefold())))
     
-    # Sort messages
-    if 'date' in filtered_df.columns and 'time' in filtered_df.columns:
-        filtered_df = filtered_df.sort_values(by=['date', 'time'], ascending=(sort_order == "Oldest First"))
+    positions = select_rows(message_index, combine_bitsets(bitsets), candidates, newest_first=(sort_order == "Newest First"))
     
-    st.markdown(f"**Showing {len(filtered_df)} messages**")
+    st.markdown(f"**Showing {len(positions)} messages**")
     st.markdown("")
     
-    if filtered_df.empty:
-        st.markdown('<div class="no-data-message">📭 No messages found matching your filters.</div>', unsafe_allow_html=True)
+    if not len(positions):
+        render_html('<div class="no-data-message">📭 No messages found matching your filters.</div>')
         return
     
-    # Display messages
-    for idx, row in filtered_df.iterrows():
-        sender_name = row.get('sender_name', 'Unknown')
-        sender_url = row.get('sender_linkedin_url', '')
-        lead_name = row.get('lead_name', '')
-        lead_url = row.get('lead_linkedin_url', '')
-        message = row.get('message', '')
-        date = row.get('date', '')
-        time = row.get('time', '')
-        shared_content = row.get('shared_content', '')
-        
-        # Determine if I sent this message
-        is_my_message = is_me(sender_name, sender_url)
-        
-        # Determine the other person (contact)
-        if is_my_message:
-            contact_name = lead_name
-            contact_url = lead_url
-            badge_text = "You"
-            badge_style = "background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);"
-        else:
-            contact_name = sender_name
-            contact_url = sender_url
-            badge_text = "Received"
-            badge_style = "background: #10b981;"
-        
-        st.markdown(f"""
-        <div class="message-card-all">
-            <div class="message-header">
-                <div>
-                    <div class="message-sender">
-                        {sender_name}
-                        <span class="message-badge" style="{badge_style}">{badge_text}</span>
-                    </div>
-                </div>
-                <div class="message-timestamp">
-                    🗓️ {date} • 🕐 {time}
+    # Display messages, reading back only this page's spilled text
+    page = paginate(positions, "message_page")
+    rows = with_message_text(df, page)
+    for i, position in enumerate(page.tolist()):
+        render_message_card(rows.iloc[i], position)
+
+def paginate(positions, key):
+    """Return the slice of row positions on the page chosen with a page number input"""
+    page_count = (len(positions) - 1) // MESSAGE_PAGE_SIZE + 1
+    page = 1
+    if page_count > 1:
+        page = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, value=1, key=key)
+    return positions[(page - 1) * MESSAGE_PAGE_SIZE:page * MESSAGE_PAGE_SIZE]
+
+def render_message_card(row, position=None):
+    """Render one message as a full-width card; a row `position` adds a button opening its similar messages"""
+    sender_name = escape_html(row.get('sender_name', 'Unknown'))
+    sender_url = profile_href(row.get('sender_linkedin_url', ''))
+    lead_name = escape_html(row.get('lead_name', ''))
+    lead_url = profile_href(row.get('lead_linkedin_url', ''))
+    message = escape_html(row.get('message', ''))
+    date = escape_html(row.get('date', ''))
+    time = escape_html(row.get('time', ''))
+    shared_content = escape_html(row.get('shared_content', ''))
+    
+    # Determine if I sent this message
+    is_my_message = row['sender_owner'] >= 0
+    
+    # Determine the other person (contact)
+    if is_my_message:
+        contact_name = lead_name
+        contact_url = lead_url
+        badge_text = "You"
+        badge_style = "background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);"
+    else:
+        contact_name = sender_name
+        contact_url = sender_url
+        badge_text = "Received"
+        badge_style = "background: #10b981;"
+    
+    render_html(f"""
+    <div class="message-card-all">
+        <div class="message-header">
+            <div>
+                <div class="message-sender">
+                    {sender_name}
+                    <span class="message-badge" style="{badge_style}">{badge_text}</span>
                 </div>
             </div>
-            
-            <div class="message-content">
-                {message}
-            </div>
-            
-            <div class="message-footer">
-                <span>
-                    <strong>Contact:</strong> {contact_name if contact_name else 'N/A'}
-                </span>
-                {f'<span><strong>📎 Attachment:</strong> {shared_content}</span>' if shared_content else ''}
-                {f'<a href="{contact_url}" target="_blank" class="linkedin-link">🔗 View LinkedIn Profile →</a>' if contact_url else ''}
+            <div class="message-timestamp">
+                🗓️ {date} • 🕐 {time}
             </div>
         </div>
-        """, unsafe_allow_html=True)
+        
+        <div class="message-content">
+            {message}
+        </div>
+        
+        <div class="message-footer">
+            <span>
+                <strong>Contact:</strong> {contact_name if contact_name else 'N/A'}
+            </span>
+            {f'<span><strong>📎 Attachment:</strong> {shared_content}</span>' if shared_content else ''}
+            {f'<a href="{contact_url}" target="_blank" class="linkedin-link">🔗 View LinkedIn Profile →</a>' if contact_url != '#' else ''}
+        </div>
+    </div>
+    """)
+    if position is not None:
+        st.button("🔁 Similar messages", key=f"similar_{position}", on_click=st.session_state.update, args=({'similar_row': position},))
+
+def show_similar_messages(df, rows):
+    """Panel of the messages most similar to the one picked, drawn from other contacts within `rows`"""
+    position = st.session_state.get('similar_row')
+    if position is None or position >= len(df):
+        return
+    
+    eligible = np.zeros(len(df), dtype=bool)
+    eligible[rows] = True
+    similarity = get_similarity_index(df, get_data_version(df))
+    matches = find_similar_messages(df, similarity, position, eligible)
+    
+    with st.container(border=True):
+        col1, col2 = st.columns([5, 1])
+        with col1:
+            st.markdown("### 🔁 Similar Messages")
+        with col2:
+            st.button("✖ Close", key="close_similar", on_click=st.session_state.pop, args=('similar_row', None))
+        st.markdown(f"*Most similar to:* {with_message_text(df, [position])['message'].iat[0][:200]}")
+        if not matches:
+            render_html('<div class="no-data-message">📭 No similar messages from other contacts.</div>')
+        rows = with_message_text(df, [row for row, _ in matches])
+        for i, (row, score) in enumerate(matches):
+            st.markdown(f"**{score:.0%} similar**")
+            render_message_card(rows.iloc[i])
+    
+    st.markdown("---")
+
+def show_shared_content(df, attachment_index):
+    """Display shared links and files grouped by domain, with the messages that shared them"""
+    st.header("📎 Shared Content")
+    st.markdown("*Links and files exchanged in your conversations, grouped by domain*")
+    st.markdown("")
+    
+    domains = attachment_index['domains']
+    if not domains:
+        render_html('<div class="no-data-message">📭 No shared content found.</div>')
+        return
+    
+    col1, col2 = st.columns([1, 2])
+    with col1:
+        st.markdown("**Domains**")
+        st.dataframe(
+            pd.DataFrame(domains, columns=['Domain', 'Messages']),
+            hide_index=True,
+            use_container_width=True
+        )
+    with col2:
+        domain = st.selectbox(
+            "Domain",
+            [name for name, _ in domains],
+            format_func=lambda name: f"{name} ({len(attachment_index['domain_rows'][name])} messages)",
+            key="shared_domain"
+        )
+        links = attachment_index['links']
+        links = links[links['domain'] == domain]
+        st.markdown(f"**{len(links)} distinct links**")
+        st.dataframe(
+            links.reset_index().rename(columns={'link': 'Link', 'shares': 'Shares'})[['Link', 'Shares']],
+            hide_index=True,
+            use_container_width=True
+        )
+    
+    st.markdown("---")
+    
+    # Newest shares first
+    positions = attachment_index['domain_rows'][domain]
+    positions = positions[np.argsort(get_message_timestamps(df)[positions], kind='stable')[::-1]]
+    st.markdown(f"**Showing {len(positions)} messages sharing {domain}**")
+    page = paginate(positions, "shared_page")
+    rows = with_message_text(df, page)
+    for i, position in enumerate(page.tolist()):
+        render_message_card(rows.iloc[i], position)
 
 if __name__ == "__main__":
-    main()
+    if METRICS_PORT:
+        metrics.start_server(int(METRICS_PORT))
+    if not st.runtime.exists():
+        # Launched as `python app.py [streamlit options]`: start warming up at process start, then
+        # serve this script from the same process so sessions find the caches already filled
+        start_warm_up()
+        from streamlit.web import cli as streamlit_cli
+        sys.argv = ["streamlit", "run", os.path.abspath(__file__), *sys.argv[1:]]
+        sys.exit(streamlit_cli.main())
+    
+    # Under `streamlit run` the earliest hook is the first script run
+    start_warm_up()
+    with metrics.timer('linkup_rerun_seconds') as labels:
+        try:
+            main()
+        finally:
+            labels['view'] = st.session_state.get("view_mode", "none")
+    if METRICS_FILE:
+        metrics.dump(METRICS_FILE)
@@ -0,0 +1,308 @@
+"""Headless batch jobs for the LinkedIn chat viewer, e.g. from cron:
+
+    python cli.py export --credentials service_account.json --out exports/ --format parquet
+    python cli.py reports --credentials service_account.json --out reports/ --workers 8
+
+Reuses the app's loader, shared snapshot, contact index and stats without a
+browser session.
+"""
+import argparse
+import html
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import streamlit.config
+import streamlit.logger
+
+import app
+
+# Bare-mode Streamlit logs a warning for every cached call made outside a script run
+streamlit.config.set_option("logger.level", "error")
+streamlit.logger.set_log_level("error")
+
+# Export formats and their file extensions
+EXPORT_FORMATS = {'parquet': 'parquet', 'csv': 'csv', 'jsonl': 'jsonl'}
+
+# Rows per chunk written to an export file; bounds memory beyond the snapshot itself
+EXPORT_CHUNK_ROWS = 50_000
+
+# Contacts rendered per process-pool task; amortizes task pickling across small conversations
+REPORT_BATCH_CONTACTS = 25
+
+# Append-only record of finished reports, read back to resume partial runs
+REPORT_MANIFEST = "manifest.jsonl"
+
+# Message columns exported alongside each conversation's contact
+MESSAGE_COLUMNS = ['date', 'time', 'sender_name', 'sender_linkedin_url', 'lead_name',
+                   'lead_linkedin_url', 'message', 'shared_content']
+
+def log(message):
+    """Progress line on stderr, so stdout stays clean for redirection"""
+    print(message, file=sys.stderr, flush=True)
+
+def load_snapshot(credentials_path):
+    """Sync (or attach the shared snapshot) exactly as the app does, raising on failure"""
+    with open(credentials_path, encoding='utf-8') as f:
+        client = app.authorize_client(f.read())
+    state = app.get_sync_state(app.SPREADSHEET_ID, app.SHEET_NAME)
+    with state['lock']:
+        app.refresh_snapshot(client, state)
+        return state['df']
+
+def resolve_owner(name):
+    """Owner partition key for a profile name or index, or ALL_OWNERS for 'all'"""
+    if name.lower() == 'all':
+        return app.ALL_OWNERS
+    for key, profile in enumerate(app.OWNER_PROFILES):
+        if name == str(key) or name.casefold() == profile['name'].casefold():
+            return key
+    raise SystemExit(f"Unknown owner {name!r}; expected 'all', a profile index or one of: "
+                     + ", ".join(profile['name'] for profile in app.OWNER_PROFILES))
+
+def write_table(path, fmt, frames):
+    """Stream DataFrame chunks into one Parquet, CSV or JSONL file and return the row count"""
+    rows = 0
+    if fmt == 'parquet':
+        writer = None
+        for frame in frames:
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema, compression='zstd')
+            writer.write_table(table.cast(writer.schema))
+            rows += len(frame)
+        if writer is not None:
+            writer.close()
+        return rows
+    
+    with open(path, 'w', encoding='utf-8', newline='') as sink:
+        for frame in frames:
+            if fmt == 'csv':
+                frame.to_csv(sink, header=(rows == 0), index=False)
+            else:
+                frame.to_json(sink, orient='records', lines=True, force_ascii=False)
+            rows += len(frame)
+    return rows
+
+def contact_chunks(contacts):
+    """Contact summaries in chunks of EXPORT_CHUNK_ROWS"""
+    ids = sorted(contacts)
+    for start in range(0, max(len(ids), 1), EXPORT_CHUNK_ROWS):
+        chunk = [contacts[contact_id] for contact_id in ids[start:start + EXPORT_CHUNK_ROWS]]
+        yield pd.DataFrame({
+            'contact_id': pd.Series([contact['id'] for contact in chunk], dtype=np.int64),
+            'name': pd.Series([contact['name'] for contact in chunk], dtype=str),
+            'url': pd.Series([contact['url'] for contact in chunk], dtype=str),
+            'last_contact': pd.Series([contact['last_contact'] for contact in chunk], dtype=str),
+            'sent_count': pd.Series([contact['sent_count'] for contact in chunk], dtype=np.int64),
+            'received_count': pd.Series([contact['received_count'] for contact in chunk], dtype=np.int64)
+        })
+
+def message_chunks(df, contacts):
+    """Every contact's conversation in timestamp order, grouped into chunks of about EXPORT_CHUNK_ROWS rows"""
+    mine = df['sender_owner'].to_numpy() >= 0
+    columns = [column for column in MESSAGE_COLUMNS if column in df.columns]
+    pending = []
+    
+    def flush():
+        positions = np.concatenate([rows for _, rows in pending]) if pending else np.empty(0, dtype=np.int64)
+        frame = app.with_message_text(df, positions)[columns].reset_index(drop=True)
+        frame.insert(0, 'contact_id', np.concatenate(
+            [np.full(len(rows), contact_id, dtype=np.int64) for contact_id, rows in pending]
+        ) if pending else np.empty(0, dtype=np.int64))
+        frame.insert(1, 'direction', np.where(mine[positions], 'sent', 'received'))
+        pending.clear()
+        return frame
+    
+    buffered = 0
+    for contact_id in sorted(contacts):
+        rows = contacts[contact_id]['rows']
+        pending.append((contact_id, rows))
+        buffered += len(rows)
+        if buffered >= EXPORT_CHUNK_ROWS:
+            yield flush()
+            buffered = 0
+    if pending or not contacts:
+        yield flush()
+
+def stats_chunks(df):
+    """One row of overview stats per owner partition"""
+    records = []
+    for owner in [app.ALL_OWNERS] + list(range(len(app.OWNER_PROFILES))):
+        stats = app.get_overview_stats(df, owner)
+        records.append({
+            'owner': 'all' if owner == app.ALL_OWNERS else app.OWNER_PROFILES[owner]['name'],
+            **{key: value for key, value in stats.items() if key != 'top_contacts'},
+            'top_contacts': ','.join(str(contact_id) for contact_id, _ in stats['top_contacts'])
+        })
+    yield pd.DataFrame(records)
+
+def run_export(args):
+    """Write the contacts, conversations and stats tables for one owner partition"""
+    started = time.time()
+    df = load_snapshot(args.credentials)
+    log(f"Loaded {len(df)} messages in {time.time() - started:.1f}s")
+    
+    owner = resolve_owner(args.owner)
+    rows = np.arange(len(df)) if owner == app.ALL_OWNERS else np.flatnonzero(df['owner'].to_numpy() == owner)
+    contacts = app.get_contact_info(df, rows)
+    
+    os.makedirs(args.out, exist_ok=True)
+    tables = {
+        'contacts': lambda: contact_chunks(contacts),
+        'messages': lambda: message_chunks(df, contacts),
+        'stats': lambda: stats_chunks(df)
+    }
+    for table in args.tables:
+        path = os.path.join(args.out, f"{table}.{EXPORT_FORMATS[args.format]}")
+        started = time.time()
+        count = write_table(path, args.format, tables[table]())
+        elapsed = time.time() - started
+        log(f"{table}: {count} rows -> {path} in {elapsed:.1f}s ({count / max(elapsed, 1e-9):.0f} rows/s)")
+
+def snapshot_file(df):
+    """Path of the published Arrow snapshot holding this frame's data version"""
+    directory, _ = app.snapshot_paths(app.SPREADSHEET_ID, app.SHEET_NAME)
+    return os.path.join(directory, f"snapshot-{app.get_data_version(df)}.arrow")
+
+def report_signature(contact):
+    """Changes whenever a contact's conversation gains messages, so stale reports are redone"""
+    return f"{len(contact['rows'])}:{int(contact['timestamps'][-1])}"
+
+def report_page(df, contact):
+    """Standalone HTML transcript of one conversation, styled like the contact view"""
+    body = [app.contact_header_html(contact)]
+    current_date = None
+    for msg in app.with_message_text(df, contact['rows']).to_dict('records'):
+        date = msg.get('date', '')
+        if date and date != current_date:
+            body.append(app.date_divider_html(date))
+            current_date = date
+        body.append(app.conversation_message_html(msg))
+    return f"""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Conversation with {html.escape(contact['name'])}</title>
+{app.PAGE_CSS}
+</head>
+<body class="main" style="max-width: 900px; margin: 0 auto; padding: 24px;">
+{''.join(body)}
+</body>
+</html>
+"""
+
+# Frame each report worker maps from the published snapshot once, at pool start
+_report_frame = None
+
+def init_report_worker(path):
+    """Memory-map the shared snapshot, so workers neither copy nor re-download the data"""
+    global _report_frame
+    _report_frame = app.attach_snapshot(path)
+
+def render_reports(out, contacts):
+    """Write one batch of reports atomically; returns (contact_id, signature, bytes) per report"""
+    results = []
+    for contact in contacts:
+        page = report_page(_report_frame, contact).encode('utf-8')
+        with tempfile.NamedTemporaryFile(dir=out, suffix=".tmp", delete=False) as tmp:
+            tmp.write(page)
+        os.replace(tmp.name, os.path.join(out, f"contact-{contact['id']}.html"))
+        results.append((contact['id'], report_signature(contact), len(page)))
+    return results
+
+def read_manifest(path):
+    """Signatures of reports finished by earlier runs; a torn last line from a crash is ignored"""
+    done = {}
+    try:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                done[entry['contact_id']] = entry['signature']
+    except OSError:
+        pass
+    return done
+
+def run_reports(args):
+    """Render every contact's conversation to HTML across a process pool, skipping up-to-date reports"""
+    started = time.time()
+    df = load_snapshot(args.credentials)
+    log(f"Loaded {len(df)} messages in {time.time() - started:.1f}s")
+    
+    owner = resolve_owner(args.owner)
+    rows = np.arange(len(df)) if owner == app.ALL_OWNERS else np.flatnonzero(df['owner'].to_numpy() == owner)
+    contacts = app.get_contact_info(df, rows)
+    
+    os.makedirs(args.out, exist_ok=True)
+    manifest_path = os.path.join(args.out, REPORT_MANIFEST)
+    done = {} if args.force else read_manifest(manifest_path)
+    pending = [
+        contact for contact_id, contact in sorted(contacts.items())
+        if done.get(contact_id) != report_signature(contact)
+        or not os.path.exists(os.path.join(args.out, f"contact-{contact_id}.html"))
+    ]
+    log(f"{len(contacts) - len(pending)} of {len(contacts)} reports up to date; rendering {len(pending)}")
+    if not pending:
+        return
+    
+    started = time.time()
+    finished = messages = written = 0
+    batches = [pending[i:i + REPORT_BATCH_CONTACTS] for i in range(0, len(pending), REPORT_BATCH_CONTACTS)]
+    with open(manifest_path, 'a', encoding='utf-8') as manifest, ProcessPoolExecutor(
+        max_workers=args.workers, initializer=init_report_worker, initargs=(snapshot_file(df),)
+    ) as pool:
+        futures = {pool.submit(render_reports, args.out, batch): batch for batch in batches}
+        for future in as_completed(futures):
+            for contact_id, signature, size in future.result():
+                manifest.write(json.dumps({'contact_id': contact_id, 'signature': signature}) + "\n")
+                written += size
+            manifest.flush()
+            finished += len(futures[future])
+            messages += sum(len(contact['rows']) for contact in futures[future])
+            elapsed = time.time() - started
+            log(f"{finished}/{len(pending)} reports, {finished / elapsed:.0f} contacts/s, "
+                f"{messages / elapsed:.0f} messages/s, {written / 1e6:.1f} MB")
+
+def build_parser():
+    """Command-line interface with one subcommand per batch job"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    export = commands.add_parser('export', help="Export contacts, conversations and overview stats")
+    export.add_argument('--credentials', default=app.CREDENTIALS_FILE,
+                        required=app.CREDENTIALS_FILE is None,
+                        help="Service account JSON file (default: LINKUP_CREDENTIALS_FILE)")
+    export.add_argument('--out', required=True, help="Output directory")
+    export.add_argument('--format', choices=list(EXPORT_FORMATS), default='parquet')
+    export.add_argument('--owner', default='all', help="'all', a profile index or a profile name")
+    export.add_argument('--tables', nargs='+', choices=['contacts', 'messages', 'stats'],
+                        default=['contacts', 'messages', 'stats'])
+    export.set_defaults(run=run_export)
+    
+    reports = commands.add_parser('reports', help="Render each contact's conversation to a standalone HTML file")
+    reports.add_argument('--credentials', default=app.CREDENTIALS_FILE,
+                         required=app.CREDENTIALS_FILE is None,
+                         help="Service account JSON file (default: LINKUP_CREDENTIALS_FILE)")
+    reports.add_argument('--out', required=True, help="Output directory; reruns resume from its manifest")
+    reports.add_argument('--owner', default='all', help="'all', a profile index or a profile name")
+    reports.add_argument('--workers', type=int, default=os.cpu_count(), help="Worker processes (default: CPU count)")
+    reports.add_argument('--force', action='store_true', help="Re-render reports that are already up to date")
+    reports.set_defaults(run=run_reports)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.run(args)
+
+if __name__ == "__main__":
+    main()
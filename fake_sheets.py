@@ -0,0 +1,264 @@
+"""Synthetic LinkedIn chat sheet, an in-process stand-in for the gspread client, and a
+local HTTP server implementing the Sheets v4 endpoints gspread uses:
+    
+    python fake_sheets.py --rows 100000 --latency 80 --bandwidth 4 --error-rate 0.05 --append-every 30
+    LINKUP_SHEETS_ENDPOINT=http://127.0.0.1:8765 streamlit run app.py
+
+Used to benchmark fetch and quota handling without Google credentials or
+network access.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from gspread.utils import a1_range_to_grid_range
+from gspread.worksheet import ValueRange
+
+# Sheet header as the LinkedIn scraper writes it, including columns the app never reads
+HEADER = ['sender_name', 'sender_linkedin_url', 'lead_name', 'lead_linkedin_url', 'message',
+          'date', 'time', 'shared_content', 'conversation_id', 'scraped_at']
+
+# Account whose messages count as sent; matches the app's default profile
+OWNER = ("Donmenico Hudson", "https://www.linkedin.com/in/donmenicohudson/")
+
+FIRST_NAMES = ["José", "Jane", "John", "Zoë", "Ali", "Priya", "Chen", "Fatima", "Lars", "Amara", "Mateo", "Yuki"]
+LAST_NAMES = ["Álvarez", "Doe", "Smith", "Brown", "Khan", "Patel", "Wei", "Haddad", "Berg", "Okafor", "Rossi", "Sato"]
+WORDS = ("hi hello thanks great pricing quote meeting call tomorrow next week demo product team schedule "
+         "budget proposal follow up interested not now unsubscribe offer contract renewal timeline").split()
+SHARED = ["", "", "", "", "https://www.example.com/deck?utm_source=linkedin", "proposal.pdf",
+          "https://docs.google.com/document/d/abc/", "https://calendly.com/team/intro"]
+
+def make_rows(count, contacts=500, seed=0, start=None):
+    """Deterministic sheet rows: `count` messages spread over `contacts` conversations, 37 minutes apart"""
+    # People depend only on the contact count, so appended batches keep the same names per profile
+    names = random.Random(contacts)
+    people = [
+        (f"{names.choice(FIRST_NAMES)} {names.choice(LAST_NAMES)}", f"https://www.linkedin.com/in/contact-{i}/")
+        for i in range(contacts)
+    ]
+    rng = random.Random(seed)
+    start = start or datetime(2024, 1, 1)
+    rows = []
+    for i in range(count):
+        lead_name, lead_url = rng.choice(people)
+        sent = rng.random() < 0.5
+        sender_name, sender_url = OWNER if sent else (lead_name, lead_url)
+        stamp = start + timedelta(minutes=37 * i)
+        rows.append([
+            sender_name, sender_url, lead_name, lead_url,
+            " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 30))),
+            stamp.strftime("%Y-%m-%d"), stamp.strftime("%H:%M:%S"), rng.choice(SHARED),
+            lead_url.rstrip('/').rsplit('-', 1)[-1], stamp.isoformat()
+        ])
+    return rows
+
+def grid_values(table, a1, major_dimension='ROWS'):
+    """ValueRange JSON for one A1 range of `table`, trimming trailing blanks as the API does"""
+    grid = a1_range_to_grid_range(a1.rsplit('!', 1)[-1])
+    start, end = grid.get('startColumnIndex', 0), grid.get('endColumnIndex')
+    cells = [row[start:end] for row in table[grid.get('startRowIndex', 0):grid.get('endRowIndex')]]
+    if major_dimension == 'COLUMNS':
+        width = max(map(len, cells), default=0)
+        cells = [[row[i] if i < len(row) else '' for row in cells] for i in range(width)]
+    
+    values = []
+    for line in cells:
+        line = list(line)
+        while line and line[-1] == '':
+            line.pop()
+        values.append(line)
+    while values and not values[-1]:
+        values.pop()
+    result = {'range': a1, 'majorDimension': major_dimension}
+    if values:
+        result['values'] = values
+    return result
+
+class FakeWorksheet:
+    """The subset of gspread.Worksheet the app's fetch path uses"""
+    
+    def __init__(self, rows, header=HEADER):
+        self.rows = rows
+        self.header = header
+    
+    @property
+    def row_count(self):
+        return len(self.rows) + 1
+    
+    def row_values(self, row, **kwargs):
+        return list(self.header) if row == 1 else list(self.rows[row - 2])
+    
+    def batch_get(self, ranges, major_dimension='ROWS', **kwargs):
+        table = [self.header] + self.rows
+        return [ValueRange.from_json(grid_values(table, a1, major_dimension)) for a1 in ranges]
+    
+    def append_rows(self, rows):
+        self.rows.extend(rows)
+
+class FakeSpreadsheet:
+    def __init__(self, worksheet):
+        self._worksheet = worksheet
+    
+    def worksheet(self, title):
+        return self._worksheet
+
+class FakeClient:
+    """Stands in for the authorized gspread client; every key and title resolves to one worksheet"""
+    
+    def __init__(self, rows):
+        self.sheet = FakeWorksheet(rows)
+    
+    def open_by_key(self, key):
+        return FakeSpreadsheet(self.sheet)
+
+# Client handed to app sessions under test; set by the harness before sessions start
+CLIENT = None
+
+class FakeUpload:
+    """Takes the place of the uploaded service-account file"""
+    
+    def read(self):
+        return b"{}"
+
+def sheets_error(status, message):
+    """Error body in the shape the Sheets API returns, which gspread's APIError parses"""
+    code = 'RESOURCE_EXHAUSTED' if status == HTTPStatus.TOO_MANY_REQUESTS else status.name
+    return {'error': {'code': status.value, 'message': message, 'status': code}}
+
+class FakeSheetsHandler(BaseHTTPRequestHandler):
+    """Serves spreadsheet metadata, values.get and values:batchGet for the server's one worksheet"""
+    
+    def do_GET(self):
+        server = self.server
+        time.sleep(max(0.0, random.gauss(server.latency, server.latency / 4)))
+        
+        # Rate limits: a fixed per-minute quota, plus random injected 429s
+        with server.lock:
+            now = time.monotonic()
+            server.requests = [stamp for stamp in server.requests if now - stamp < 60] + [now]
+            over_quota = server.quota and len(server.requests) > server.quota
+        if over_quota or random.random() < server.error_rate:
+            self.reply(HTTPStatus.TOO_MANY_REQUESTS, sheets_error(
+                HTTPStatus.TOO_MANY_REQUESTS, "Quota exceeded for quota metric 'Read requests'"
+            ), headers={'Retry-After': '1'} if over_quota else None)
+            return
+        
+        url = urlsplit(self.path)
+        params = parse_qs(url.query)
+        parts = url.path.strip('/').split('/', 4)
+        if len(parts) < 3 or parts[:2] != ['v4', 'spreadsheets']:
+            self.reply(HTTPStatus.NOT_FOUND, sheets_error(HTTPStatus.NOT_FOUND, "Requested entity was not found."))
+            return
+        
+        spreadsheet_id = parts[2].split(':')[0]
+        with server.lock:
+            table = [server.worksheet.header] + server.worksheet.rows
+        major_dimension = params.get('majorDimension', ['ROWS'])[0]
+        if len(parts) == 3 and not parts[2].endswith(':batchGet'):
+            self.reply(HTTPStatus.OK, self.metadata(spreadsheet_id, len(table)))
+        elif len(parts) == 4 and parts[3] == 'values:batchGet':
+            self.reply(HTTPStatus.OK, {
+                'spreadsheetId': spreadsheet_id,
+                'valueRanges': [grid_values(table, a1, major_dimension) for a1 in params.get('ranges', [])]
+            })
+        elif len(parts) == 5 and parts[3] == 'values':
+            self.reply(HTTPStatus.OK, grid_values(table, unquote(parts[4]), major_dimension))
+        else:
+            self.reply(HTTPStatus.NOT_FOUND, sheets_error(HTTPStatus.NOT_FOUND, "Requested entity was not found."))
+    
+    def metadata(self, spreadsheet_id, row_count):
+        return {
+            'spreadsheetId': spreadsheet_id,
+            'properties': {'title': "Fake LinkedIn chat history", 'locale': 'en_US', 'timeZone': 'Etc/UTC'},
+            'sheets': [{'properties': {
+                'sheetId': 0,
+                'title': self.server.title,
+                'index': 0,
+                'sheetType': 'GRID',
+                'gridProperties': {'rowCount': row_count, 'columnCount': len(self.server.worksheet.header)}
+            }}]
+        }
+    
+    def reply(self, status, body, headers=None):
+        payload = json.dumps(body).encode('utf-8')
+        if self.server.bandwidth:
+            # Large responses take proportionally longer, as they do from Google
+            time.sleep(len(payload) / self.server.bandwidth)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=UTF-8')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+    
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+def append_forever(server, every, count, seed):
+    """Simulate the scraper: append `count` new messages every `every` seconds"""
+    batch = 0
+    while True:
+        time.sleep(every)
+        batch += 1
+        with server.lock:
+            rows = server.worksheet.rows
+            start = datetime.fromisoformat(rows[-1][9]) + timedelta(minutes=37) if rows else None
+            server.worksheet.append_rows(make_rows(count, server.contacts, seed + batch, start))
+
+def make_server(rows, title, host='127.0.0.1', port=8765, latency=0.0, error_rate=0.0, quota=0,
+                contacts=500, bandwidth=0.0, verbose=False):
+    """Threaded fake Sheets API server over `rows`; call serve_forever() to run it"""
+    server = ThreadingHTTPServer((host, port), FakeSheetsHandler)
+    server.worksheet = FakeWorksheet(rows)
+    server.contacts = contacts
+    server.title = title
+    server.latency = latency
+    server.error_rate = error_rate
+    server.quota = quota
+    server.bandwidth = bandwidth
+    server.verbose = verbose
+    server.requests = []
+    server.lock = threading.Lock()
+    return server
+
+def main(argv=None):
+    from app import SHEET_NAME
+    
+    parser = argparse.ArgumentParser(description="Local fake Google Sheets v4 API over a synthetic chat sheet")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--rows', type=int, default=20000, help="Messages in the synthetic sheet")
+    parser.add_argument('--contacts', type=int, default=500, help="Distinct contacts in the synthetic sheet")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--title', default=SHEET_NAME, help="Worksheet title to serve")
+    parser.add_argument('--latency', type=float, default=0.0, help="Mean added latency per request, in ms")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument('--quota', type=int, default=0, help="Requests per minute before 429s (0: unlimited)")
+    parser.add_argument('--bandwidth', type=float, default=0.0, help="Per-response throughput in MB/s (0: unlimited)")
+    parser.add_argument('--append-every', type=float, default=0.0, help="Seconds between simulated row appends")
+    parser.add_argument('--append-rows', type=int, default=50, help="Messages added per append")
+    parser.add_argument('--verbose', action='store_true', help="Log every request")
+    args = parser.parse_args(argv)
+    
+    server = make_server(
+        make_rows(args.rows, args.contacts, args.seed), args.title, args.host, args.port,
+        latency=args.latency / 1000, error_rate=args.error_rate, quota=args.quota, contacts=args.contacts,
+        bandwidth=args.bandwidth * 1e6, verbose=args.verbose
+    )
+    if args.append_every > 0:
+        threading.Thread(
+            target=append_forever, args=(server, args.append_every, args.append_rows, args.seed), daemon=True
+        ).start()
+    print(f"Fake Sheets API on http://{args.host}:{server.server_port} serving {args.rows} rows as '{args.title}'")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+"""Concurrent-session load test for app.py, in-process or against a running server:
+
+    python loadtest.py --sessions 1 5 10 20 --rows 50000
+
+    python fake_sheets.py --rows 50000 &
+    LINKUP_SHEETS_ENDPOINT=http://127.0.0.1:8765 streamlit run app.py --server.port 8501 &
+    python loadtest.py --sessions 1 5 10 20 --server ws://127.0.0.1:8501 --server-pid <pid>
+
+Each simulated session goes through a random mix of view switches, message
+searches, contact lookups and page turns. By default sessions are Streamlit
+AppTests in this process against the in-process fake Sheets client; AppTest
+cannot run scripts concurrently, so their reruns are serialized and latency
+includes the queue. With --server, each session is a headless websocket
+client of a real server, whose reruns overlap as browser sessions' do. Per
+session count the harness reports rerun latency percentiles, CPU time per
+rerun and resident memory (of the server process, given --server-pid).
+"""
+import argparse
+import asyncio
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+import traceback
+
+# Keep snapshots from this run away from a real deployment's shared directory
+os.environ.setdefault("LINKUP_SNAPSHOT_DIR", tempfile.mkdtemp(prefix="linkup-loadtest-"))
+
+import numpy as np
+import streamlit.config
+import streamlit.logger
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+from streamlit.testing.v1 import AppTest
+
+import fake_sheets
+
+# Widget warnings would otherwise repeat once per simulated rerun
+streamlit.config.set_option("logger.level", "error")
+streamlit.logger.set_log_level("error")
+
+# Script each simulated session runs: the real app, with the upload and client swapped for fakes
+SESSION_SCRIPT = """
+import app
+import fake_sheets
+app.st.file_uploader = lambda *args, **kwargs: fake_sheets.FakeUpload()
+app.init_google_sheets = lambda credentials_json: fake_sheets.CLIENT
+# AppTest mocks the cookie jar; each session is a fresh browser without a visitor cookie
+app.visitor_id = lambda: None
+app.main()
+"""
+
+# AppTest installs a process-global mock runtime for each run and clears it afterwards, so
+# concurrent runs must not overlap. Timings include the wait for this lock, which is how
+# CPU-bound reruns queue behind the GIL on a real server too.
+RUN_LOCK = threading.Lock()
+
+# Searches replayed in All Messages, from plain words to compiled boolean queries
+SEARCHES = ["pricing", "demo", "meeting tomorrow", "pricing OR quote -unsubscribe",
+            'from:"Jane" after:2024-02-01', "has:attachment proposal", ""]
+
+def current_rss():
+    """Resident set size in bytes, falling back to the peak where /proc is unavailable"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def switch_view(at, rng):
+    radio = at.radio[0]
+    radio.set_value(rng.choice(radio.options))
+
+def search_messages(at, rng):
+    if at.radio[0].value != "📝 All Messages":
+        at.radio[0].set_value("📝 All Messages")
+        return
+    at.text_input(key="message_search").set_value(rng.choice(SEARCHES))
+
+def pick_contact(at, rng):
+    if at.radio[0].value != "👤 Contact Conversation":
+        at.radio[0].set_value("👤 Contact Conversation")
+        return
+    pickers = [box for box in at.selectbox if box.label == "Select a contact to view conversation"]
+    if pickers and pickers[0].options and rng.random() < 0.6:
+        pickers[0].select_index(rng.randrange(len(pickers[0].options)))
+    else:
+        at.text_input(key="contact_picker_search").set_value(rng.choice(fake_sheets.FIRST_NAMES)[:rng.randint(1, 4)])
+
+def turn_page(at, rng):
+    pages = [box for box in at.number_input if box.key in ("message_page", "shared_page")]
+    if pages:
+        pages[0].set_value(rng.randint(pages[0].min, pages[0].max))
+    else:
+        switch_view(at, rng)
+
+# Interactions and their relative frequency in a simulated session
+INTERACTIONS = [(switch_view, 3), (search_messages, 4), (pick_contact, 4), (turn_page, 2)]
+
+def timed_run(at, latencies):
+    """Rerun the session's script and record how long the user waited for it"""
+    started = time.perf_counter()
+    with RUN_LOCK:
+        at.run()
+    latencies.append(time.perf_counter() - started)
+
+def run_session(seed, interactions, latencies, errors):
+    """Open the app, then replay `interactions` random widget changes, timing every rerun"""
+    rng = random.Random(seed)
+    actions, weights = zip(*INTERACTIONS)
+    at = AppTest.from_string(SESSION_SCRIPT, default_timeout=600)
+    timed_run(at, latencies)
+    for _ in range(interactions):
+        try:
+            rng.choices(actions, weights)[0](at, rng)
+            timed_run(at, latencies)
+        except Exception as e:
+            errors.append(f"{type(e).__name__}: {e} ({traceback.extract_tb(e.__traceback__)[-1].name})")
+        if at.exception:
+            errors.extend(str(exception.value) for exception in at.exception)
+
+class ServerSession:
+    """One headless browser session on a running server: the widgets of its last run and the values it set"""
+    
+    def __init__(self, connection):
+        self.connection = connection
+        self.widgets = {}
+        self.states = {}
+        self.view = None
+    
+    def find(self, kind, key=None, label=None):
+        """The first widget of this kind from the last run with the given user key or label"""
+        for widget_id, (widget_kind, proto) in self.widgets.items():
+            if widget_kind == kind and (key is None or widget_id.endswith(f"-{key}")) and (label is None or proto.label == label):
+                return widget_id, proto
+        return None, None
+    
+    def set(self, widget_id, **value):
+        state = WidgetState(id=widget_id, **value)
+        self.states[widget_id] = state
+    
+    async def rerun(self, latencies, errors):
+        """Send this session's widget values, then wait for the script run to finish"""
+        message = BackMsg()
+        message.rerun_script.query_string = ""
+        message.rerun_script.widget_states.widgets.extend(self.states.values())
+        started = time.perf_counter()
+        await self.connection.send(message.SerializeToString())
+        self.widgets = {}
+        while True:
+            forward = ForwardMsg()
+            forward.ParseFromString(await self.connection.recv())
+            kind = forward.WhichOneof('type')
+            if kind == 'script_finished':
+                break
+            if kind != 'delta' or forward.delta.WhichOneof('type') != 'new_element':
+                continue
+            element = forward.delta.new_element
+            element_kind = element.WhichOneof('type')
+            if element_kind == 'exception':
+                errors.append(f"{element.exception.type}: {element.exception.message}")
+            elif element_kind in ('radio', 'selectbox', 'text_input', 'number_input'):
+                proto = getattr(element, element_kind)
+                self.widgets[proto.id] = (element_kind, proto)
+        latencies.append(time.perf_counter() - started)
+
+def show_view(session, view):
+    """Select a view on the view radio; returns False when it was already showing"""
+    widget_id, radio = session.find('radio', key="view_mode")
+    current = session.view or (radio.options[radio.default] if radio else None)
+    if radio is None or current == view:
+        return False
+    session.set(widget_id, string_value=view)
+    session.view = view
+    return True
+
+def server_switch_view(session, rng):
+    _, radio = session.find('radio', key="view_mode")
+    if radio is not None:
+        show_view(session, rng.choice(list(radio.options)))
+
+def server_search_messages(session, rng):
+    if not show_view(session, "📝 All Messages"):
+        widget_id, _ = session.find('text_input', key="message_search")
+        if widget_id:
+            session.set(widget_id, string_value=rng.choice(SEARCHES))
+
+def server_pick_contact(session, rng):
+    if show_view(session, "👤 Contact Conversation"):
+        return
+    widget_id, picker = session.find('selectbox', label="Select a contact to view conversation")
+    if picker is not None and picker.options and rng.random() < 0.6:
+        session.set(widget_id, string_value=rng.choice(list(picker.options)))
+    else:
+        widget_id, _ = session.find('text_input', key="contact_picker_search")
+        if widget_id:
+            session.set(widget_id, string_value=rng.choice(fake_sheets.FIRST_NAMES)[:rng.randint(1, 4)])
+
+def server_turn_page(session, rng):
+    for key in ("message_page", "shared_page"):
+        widget_id, pages = session.find('number_input', key=key)
+        if widget_id:
+            session.set(widget_id, double_value=rng.randint(int(pages.min), int(pages.max)))
+            return
+    server_switch_view(session, rng)
+
+# The same interaction mix, for sessions on a running server
+SERVER_INTERACTIONS = [(server_switch_view, 3), (server_search_messages, 4), (server_pick_contact, 4), (server_turn_page, 2)]
+
+async def run_server_session(url, seed, interactions, latencies, errors):
+    """Open a websocket session on the server, then replay `interactions` random widget changes"""
+    rng = random.Random(seed)
+    actions, weights = zip(*SERVER_INTERACTIONS)
+    try:
+        async with websockets.connect(f"{url.rstrip('/')}/_stcore/stream", subprotocols=["streamlit"],
+                                      max_size=None, open_timeout=60) as connection:
+            session = ServerSession(connection)
+            await session.rerun(latencies, errors)
+            for _ in range(interactions):
+                rng.choices(actions, weights)[0](session, rng)
+                await session.rerun(latencies, errors)
+    except Exception as e:
+        errors.append(f"{type(e).__name__}: {e}")
+
+def process_usage(pid):
+    """CPU seconds and resident bytes of another process, from /proc"""
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(')', 1)[1].split()
+    with open(f"/proc/{pid}/statm") as f:
+        rss = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK"), rss
+
+def summarize(sessions, latencies, errors, cpu, elapsed, rss):
+    latencies = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    return {
+        'sessions': sessions,
+        'reruns': len(latencies),
+        'p50': np.percentile(latencies, 50),
+        'p95': np.percentile(latencies, 95),
+        'max': latencies.max(),
+        'cpu_per_rerun': cpu * 1000 / max(len(latencies), 1) if cpu is not None else float('nan'),
+        'throughput': len(latencies) / elapsed,
+        'rss': rss / 1e6 if rss is not None else float('nan'),
+        'errors': errors
+    }
+
+def run_load(sessions, interactions, seed):
+    """Run `sessions` in-process sessions (reruns serialized) and return latency, CPU and memory figures"""
+    latencies, errors = [], []
+    cpu_started = time.process_time()
+    started = time.perf_counter()
+    threads = [
+        threading.Thread(target=run_session, args=(seed + i, interactions, latencies, errors))
+        for i in range(sessions)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(sessions, latencies, errors, time.process_time() - cpu_started,
+                     time.perf_counter() - started, current_rss())
+
+def run_server_load(url, sessions, interactions, seed, pid=None):
+    """Run `sessions` concurrent websocket sessions on a server and return latency, CPU and memory figures"""
+    latencies, errors = [], []
+    cpu_started = process_usage(pid)[0] if pid else None
+    started = time.perf_counter()
+    
+    async def run_all():
+        await asyncio.gather(*(
+            run_server_session(url, seed + i, interactions, latencies, errors) for i in range(sessions)
+        ))
+    
+    asyncio.run(run_all())
+    cpu, rss = process_usage(pid) if pid else (None, None)
+    return summarize(sessions, latencies, errors, cpu - cpu_started if pid else None,
+                     time.perf_counter() - started, rss)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 5, 10, 20],
+                        help="Concurrent session counts to measure, in order")
+    parser.add_argument('--rows', type=int, default=20000, help="Messages in the synthetic sheet")
+    parser.add_argument('--contacts', type=int, default=500, help="Distinct contacts in the synthetic sheet")
+    parser.add_argument('--interactions', type=int, default=20, help="Widget interactions per session")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--server', help="Drive a running server at this ws:// URL instead of in-process AppTests "
+                                         "(--rows and --contacts then come from its sheet)")
+    parser.add_argument('--server-pid', type=int, help="Server process to report CPU and memory for")
+    args = parser.parse_args(argv)
+    
+    if args.server:
+        measure = lambda sessions, interactions: run_server_load(
+            args.server, sessions, interactions, args.seed, args.server_pid)
+    else:
+        fake_sheets.CLIENT = fake_sheets.FakeClient(fake_sheets.make_rows(args.rows, args.contacts, args.seed))
+        measure = lambda sessions, interactions: run_load(sessions, interactions, args.seed)
+        print("In-process AppTest sessions: reruns are serialized, so latency includes queueing behind "
+              "other sessions; use --server to measure overlapping reruns", file=sys.stderr)
+    
+    # A lone session first, so one-off sync and index builds are not charged to the first level
+    measure(1, 0)
+    
+    print(f"{'sessions':>8} {'reruns':>7} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} "
+          f"{'cpu ms/rerun':>13} {'reruns/s':>9} {'rss MB':>8}")
+    for sessions in args.sessions:
+        result = measure(sessions, args.interactions)
+        print(f"{result['sessions']:>8} {result['reruns']:>7} {result['p50']:>8.0f} {result['p95']:>8.0f} "
+              f"{result['max']:>8.0f} {result['cpu_per_rerun']:>13.1f} {result['throughput']:>9.1f} "
+              f"{result['rss']:>8.0f}", flush=True)
+        for error in sorted(set(result['errors']))[:5]:
+            print(f"    error: {error}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
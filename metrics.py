@@ -0,0 +1,156 @@
+"""Process-wide counters and histograms for the LinkedIn chat viewer, exposed in the
+Prometheus text format on a local HTTP endpoint and/or dumped to a file:
+
+    LINKUP_METRICS_PORT=9464 streamlit run app.py
+    curl localhost:9464/metrics
+
+The module is imported rather than re-executed on Streamlit reruns, so values
+accumulate for the life of the server process across all sessions.
+"""
+import functools
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import streamlit as st
+
+# Upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Every metric the app reports: name -> (type, help text)
+DEFINITIONS = {
+    'linkup_sheets_request_seconds': ('histogram', "Sheets API request latency per attempt, by call and HTTP status"),
+    'linkup_sheets_retries_total': ('counter', "Sheets API requests retried after a 429 or 5xx, by status"),
+    'linkup_sheets_rows_fetched_total': ('counter', "Sheet rows fetched from the Sheets API"),
+    'linkup_snapshot_refreshes_total': ('counter', "load_data refreshes by outcome: fresh, attached, synced or resynced"),
+    'linkup_cache_lookups_total': ('counter', "Calls to cached functions, by function"),
+    'linkup_cache_misses_total': ('counter', "Cached function calls that had to compute, by function"),
+    'linkup_rerun_seconds': ('histogram', "Script rerun duration, by view mode"),
+    'linkup_html_bytes_total': ('counter', "Bytes of HTML markup sent to the browser, by view mode"),
+}
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_series = {name: {} for name in DEFINITIONS}
+_server = None
+_server_attempted = False
+
+def _key(labels):
+    return tuple(sorted(labels.items()))
+
+def inc(name, amount=1, **labels):
+    """Add `amount` to a counter"""
+    key = _key(labels)
+    with _lock:
+        _series[name][key] = _series[name].get(key, 0) + amount
+
+def observe(name, value, **labels):
+    """Record one histogram observation"""
+    key = _key(labels)
+    with _lock:
+        series = _series[name].get(key)
+        if series is None:
+            series = _series[name][key] = {'buckets': [0] * len(LATENCY_BUCKETS), 'sum': 0.0, 'count': 0}
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                series['buckets'][i] += 1
+        series['sum'] += value
+        series['count'] += 1
+
+@contextmanager
+def timer(name, **labels):
+    """Time a block into a histogram; labels may be filled in by the block through the yielded dict"""
+    started = time.perf_counter()
+    try:
+        yield labels
+    finally:
+        observe(name, time.perf_counter() - started, **labels)
+
+def cached_resource(**cache_args):
+    """st.cache_resource that also counts lookups and misses for the wrapped function"""
+    def decorate(func):
+        name = func.__name__
+        
+        @functools.wraps(func)
+        def compute(*args, **kwargs):
+            inc('linkup_cache_misses_total', function=name)
+            return func(*args, **kwargs)
+        
+        cached = st.cache_resource(**cache_args)(compute)
+        
+        @functools.wraps(func)
+        def lookup(*args, **kwargs):
+            inc('linkup_cache_lookups_total', function=name)
+            return cached(*args, **kwargs)
+        
+        lookup.clear = cached.clear
+        return lookup
+    return decorate
+
+def _labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{label}="{value}"' for (label, _), value in zip(pairs, escaped)) + '}'
+
+def render():
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    with _lock:
+        for name, (kind, help_text) in DEFINITIONS.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for key, value in sorted(_series[name].items()):
+                if kind == 'counter':
+                    lines.append(f"{name}{_labels(key)} {value}")
+                    continue
+                for bound, count in zip(LATENCY_BUCKETS, value['buckets']):
+                    lines.append(f"{name}_bucket{_labels(key, [('le', bound)])} {count}")
+                lines.append(f"{name}_bucket{_labels(key, [('le', '+Inf')])} {value['count']}")
+                lines.append(f"{name}_sum{_labels(key)} {value['sum']}")
+                lines.append(f"{name}_count{_labels(key)} {value['count']}")
+    return "\n".join(lines) + "\n"
+
+def dump(path):
+    """Write the current metrics to `path` atomically, for node_exporter's textfile collector or scraping by hand"""
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile('w', dir=directory, suffix=".tmp", delete=False) as tmp:
+        tmp.write(render())
+    os.replace(tmp.name, path)
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        payload = render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+    
+    def log_message(self, format, *args):
+        pass
+
+def start_server(port, host='127.0.0.1'):
+    """Serve /metrics from a daemon thread; later calls in the same process are no-ops"""
+    global _server, _server_attempted
+    with _lock:
+        if _server_attempted:
+            return _server
+        _server_attempted = True
+        try:
+            _server = ThreadingHTTPServer((host, port), MetricsHandler)
+        # A port another replica on the host already serves is logged once; the app runs on without it
+        except OSError as e:
+            logger.warning("Metrics endpoint disabled: cannot listen on %s:%s (%s)", host, port, e)
+            return None
+    threading.Thread(target=_server.serve_forever, daemon=True).start()
+    return _server